@@ -0,0 +1,369 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+import numpy as np
+import scipy
+from scipy.spatial import cKDTree
+from scipy.sparse.csgraph import dijkstra
+from Interface.KDTree import KDTree, ArrayKDTree
+from Interface.csr_graph import CSRGraph, shortest_path as csr_shortest_path
+import Interface.synthetic_city as synthetic_city
+from Route_Planning.contraction_hierarchies import ContractionHierarchy
+from Route_Planning.landmarks import Landmarks
+from Route_Planning.Uninformed_Agorithm import (
+    bfs_search, dfs_search, iddfs_search, ucs_search, a_star_search,
+    bidirectional_ucs_search, bidirectional_a_star_search,
+)
+
+# Offline, reproducible benchmark of the routing algorithms and KD-tree variants.
+# Everything runs on a generated graph with fixed seeds, so two runs on the same
+# machine measure the same work and the JSON reports can be compared.
+#
+#   python -m Benchmarks.benchmark_suite --json bench.json
+#   python -m Benchmarks.benchmark_suite --compare bench.json
+
+REPORT_VERSION = 1
+TIMEOUT = 30
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if len(ms) == 0:
+        return None
+    return {
+        'p50': float(np.percentile(ms, 50)),
+        'p95': float(np.percentile(ms, 95)),
+        'p99': float(np.percentile(ms, 99)),
+        'mean': float(ms.mean()),
+        'max': float(ms.max()),
+        'n': int(len(ms)),
+    }
+
+
+def peak_memory(fn):
+    """Peak bytes allocated by Python and NumPy while running `fn` (tracemalloc, timed separately)."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def sample_pairs(graph, n_pairs, rng):
+    """`n_pairs` random (origin, destination) OSM id pairs with a route between them."""
+    pairs = []
+    matrix = graph.to_scipy()
+    while len(pairs) < n_pairs:
+        s, t = rng.integers(graph.number_of_nodes(), size=2).tolist()
+        if s == t:
+            continue
+        if np.isfinite(dijkstra(matrix, directed=True, indices=s)[t]):
+            pairs.append((int(graph.node_ids[s]), int(graph.node_ids[t])))
+    return pairs
+
+
+# ------------------------------------------
+# Routing
+# ------------------------------------------
+
+def routing_algorithms(G, G_csr, ch, landmarks, slow=False):
+    """
+    {name: function(origin, destination, stats) -> route}, the searches of run_benchmark
+    without its path-copying baselines. BFS, DFS and IDDFS only run with `slow`.
+    Without a networkx graph (G None) or a CH only the array-based searches are kept.
+    """
+    if G is None:
+        algorithms = {
+            "UCS (CSR)": lambda s, e, st: ucs_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+            "A* (CSR)": lambda s, e, st: a_star_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+            "A* ALT (CSR)": lambda s, e, st: a_star_search(G_csr, s, e, timeout=TIMEOUT,
+                                                           heuristic_fn=landmarks.heuristic, stats=st),
+            "Dijkstra (scipy)": lambda s, e, st: csr_shortest_path(G_csr, s, e, stats=st),
+        }
+        if ch is not None:
+            algorithms["CH"] = lambda s, e, st: ch.shortest_path(s, e, stats=st)
+        return algorithms
+
+    algorithms = {
+        "UCS": lambda s, e, st: ucs_search(G, s, e, timeout=TIMEOUT, stats=st),
+        "A*": lambda s, e, st: a_star_search(G, s, e, timeout=TIMEOUT, stats=st),
+        "A* ALT": lambda s, e, st: a_star_search(G, s, e, timeout=TIMEOUT, heuristic_fn=landmarks.heuristic, stats=st),
+        "Bi-UCS": lambda s, e, st: bidirectional_ucs_search(G, s, e, timeout=TIMEOUT, stats=st),
+        "Bi-A*": lambda s, e, st: bidirectional_a_star_search(G, s, e, timeout=TIMEOUT, stats=st),
+        "Bi-A* ALT": lambda s, e, st: bidirectional_a_star_search(G, s, e, timeout=TIMEOUT,
+                                                                  potential_fn=landmarks.pair_potential, stats=st),
+        "UCS (CSR)": lambda s, e, st: ucs_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+        "A* (CSR)": lambda s, e, st: a_star_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+        "Dijkstra (scipy)": lambda s, e, st: csr_shortest_path(G_csr, s, e, stats=st),
+    }
+    if ch is not None:
+        algorithms["CH"] = lambda s, e, st: ch.shortest_path(s, e, stats=st)
+    if slow:
+        # Uninformed searches, orders of magnitude slower on long routes
+        algorithms["BFS"] = lambda s, e, st: bfs_search(G, s, e, timeout=TIMEOUT, stats=st)
+        algorithms["DFS"] = lambda s, e, st: dfs_search(G, s, e, timeout=TIMEOUT, stats=st)
+        algorithms["IDDFS"] = lambda s, e, st: iddfs_search(G, s, e, max_depth=50, timeout=TIMEOUT, stats=st)
+    return algorithms
+
+
+def bench_routing(algorithms, pairs, repeats, warmup, memory_pairs=3):
+    results = {}
+    for name, func in algorithms.items():
+        # Warm-up on the first pairs: adjacency caches, scipy matrices, landmark bounds
+        for s, e in pairs[:warmup]:
+            func(s, e, {})
+
+        samples = []
+        expanded = []
+        failed = 0
+        # Pairs are interleaved inside every repeat so per-goal caches never see the same goal twice in a row
+        for _ in range(repeats):
+            for s, e in pairs:
+                stats = {}
+                t0 = time.perf_counter()
+                route = func(s, e, stats)
+                dur = time.perf_counter() - t0
+                if route:
+                    samples.append(dur)
+                    if 'expanded' in stats:
+                        expanded.append(stats['expanded'])
+                else:
+                    failed += 1
+
+        peak = max(peak_memory(lambda: func(s, e, {})) for s, e in pairs[:memory_pairs])
+        results[name] = {
+            'latency_ms': percentiles(samples),
+            'expanded': {'mean': float(np.mean(expanded)), 'p50': float(np.median(expanded))} if expanded else None,
+            'peak_memory_kb': peak / 1024,
+            'ok': len(samples),
+            'failed': failed,
+        }
+    return results
+
+
+# ------------------------------------------
+# Spatial search (snapping)
+# ------------------------------------------
+
+def bench_kdtree(points, queries, repeats, warmup):
+    results = {}
+    expected = cKDTree(points).query(queries)[0]
+
+    def brute_force(q):
+        d2 = ((points - q) ** 2).sum(axis=1)
+        i = int(np.argmin(d2))
+        return float(np.sqrt(d2[i])), i
+
+    variants = {
+        # name: (build function, single query function or None, batch query function or None)
+        "KDTree": (lambda: KDTree([(x, y, i) for i, (x, y) in enumerate(points.tolist())]),
+                   lambda tree, q: tree.query(q), None),
+        "ArrayKDTree": (lambda: ArrayKDTree(points),
+                        lambda tree, q: tree.query(q), lambda tree, Q: tree.query_batch(Q)),
+        "cKDTree (scipy)": (lambda: cKDTree(points),
+                            lambda tree, q: tree.query(q), lambda tree, Q: tree.query(Q)),
+        "Fuerza bruta": (lambda: None, lambda tree, q: brute_force(q), None),
+    }
+    query_list = [tuple(q) for q in queries.tolist()]
+
+    for name, (build, query, query_batch) in variants.items():
+        t0 = time.perf_counter()
+        tree = build()
+        build_s = time.perf_counter() - t0
+        build_peak = peak_memory(build)
+
+        for q in query_list[:warmup]:
+            query(tree, q)
+        samples = []
+        for _ in range(repeats):
+            for q in query_list:
+                t0 = time.perf_counter()
+                query(tree, q)
+                samples.append(time.perf_counter() - t0)
+
+        found = np.array([query(tree, q)[0] for q in query_list])
+        entry = {
+            'build_ms': build_s * 1000,
+            'build_peak_memory_kb': build_peak / 1024,
+            'latency_ms': percentiles(samples),
+            'correct': bool(np.allclose(found, expected)),
+        }
+
+        if query_batch is not None:
+            query_batch(tree, queries)
+            batch = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                query_batch(tree, queries)
+                batch.append(time.perf_counter() - t0)
+            entry['batch_ms'] = percentiles(batch)
+            entry['batch_us_per_point'] = float(np.median(batch)) / len(queries) * 1e6
+        results[name] = entry
+    return results
+
+
+# ------------------------------------------
+# Suite
+# ------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(kind='grid', n_nodes=3600, n_pairs=20, n_queries=500, repeats=3, warmup=2, seed=0, slow=False,
+              csr_only=False, with_ch=True):
+    """
+    `csr_only` skips networkx (and the searches that need it), so metro-scale graphs of
+    1M+ nodes fit in memory. `with_ch` False skips the Contraction Hierarchy, whose
+    pure-Python preprocessing takes too long on such graphs.
+    """
+    rng = np.random.default_rng(seed)
+
+    print(f"Grafo sintético {kind} de ~{n_nodes} nodos (seed={seed})...")
+    t0 = time.perf_counter()
+    city = synthetic_city.generate_city(kind, n_nodes, seed=seed)
+    if csr_only:
+        G = None
+        G_csr = city.to_csr(profiles=False)
+    else:
+        G = city.to_networkx()
+        G_csr = CSRGraph.from_networkx(G)
+    build_s = time.perf_counter() - t0
+
+    ch, ch_s = None, None
+    if with_ch:
+        t0 = time.perf_counter()
+        ch = ContractionHierarchy.build(G_csr)
+        ch_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    landmarks = Landmarks.build(G_csr, k=8, seed=seed)
+    alt_s = time.perf_counter() - t0
+
+    pairs = sample_pairs(G_csr, n_pairs, rng)
+    points = np.column_stack((G_csr.x, G_csr.y))
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    queries = rng.uniform(lo, hi, size=(n_queries, 2))
+
+    print(f"Ruteo: {len(pairs)} pares x {repeats} repeticiones...")
+    routing = bench_routing(routing_algorithms(G, G_csr, ch, landmarks, slow=slow), pairs, repeats, warmup)
+    print(f"KD-Tree: {n_queries} consultas x {repeats} repeticiones...")
+    kdtree = bench_kdtree(points, queries, repeats, warmup)
+
+    return {
+        'version': REPORT_VERSION,
+        'meta': {
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'params': {'graph': city.name, 'kind': kind, 'nodes': n_nodes, 'pairs': n_pairs, 'queries': n_queries,
+                   'repeats': repeats, 'warmup': warmup, 'seed': seed, 'slow': slow, 'csr_only': csr_only,
+                   'ch': with_ch},
+        'graph': {'nodes': G_csr.number_of_nodes(), 'edges': G_csr.number_of_edges()},
+        'preprocessing_ms': {'graph': build_s * 1000, 'CH': ch_s * 1000 if ch_s is not None else None,
+                             'ALT': alt_s * 1000},
+        'routing': routing,
+        'kdtree': kdtree,
+    }
+
+
+def print_report(report):
+    def fmt(summary, key):
+        return f"{summary[key]:.3f}" if summary else "--"
+
+    print("\n" + "=" * 95)
+    print(f"{'ALGORITMO':<18} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'NODOS EXP.':>10} | {'MEM (KB)':>9} | ESTADO")
+    print("=" * 95)
+    for name, r in report['routing'].items():
+        lat = r['latency_ms']
+        expanded = f"{r['expanded']['mean']:.0f}" if r['expanded'] else "--"
+        print(f"{name:<18} | {fmt(lat, 'p50'):>9} | {fmt(lat, 'p95'):>9} | {fmt(lat, 'p99'):>9} | {expanded:>10} | "
+              f"{r['peak_memory_kb']:>9.0f} | {r['ok']} Ok / {r['failed']} fallas")
+
+    print("\n" + "=" * 95)
+    print(f"{'KD-TREE':<18} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'BUILD (ms)':>10} | {'MEM (KB)':>9} | LOTE (us/pto)")
+    print("=" * 95)
+    for name, r in report['kdtree'].items():
+        lat = r['latency_ms']
+        batch = f"{r['batch_us_per_point']:.2f}" if 'batch_us_per_point' in r else "--"
+        check = "" if r['correct'] else "  (resultado incorrecto)"
+        print(f"{name:<18} | {fmt(lat, 'p50'):>9} | {fmt(lat, 'p95'):>9} | {fmt(lat, 'p99'):>9} | "
+              f"{r['build_ms']:>10.1f} | {r['build_peak_memory_kb']:>9.0f} | {batch}{check}")
+
+
+def compare(report, baseline, threshold=0.2, metric='p50'):
+    """
+    Print the change of `metric` against a previous report and return the entries
+    that got slower by more than `threshold` (0.2 = 20 %).
+    """
+    if baseline.get('params') != report.get('params'):
+        print("Aviso: el reporte base se generó con otros parámetros, la comparación puede no ser válida")
+
+    regressions = []
+    print("\n" + "=" * 60)
+    print(f"Comparación de {metric} contra el reporte base")
+    print("=" * 60)
+    for section in ('routing', 'kdtree'):
+        for name, r in report[section].items():
+            old = baseline.get(section, {}).get(name, {}).get('latency_ms')
+            new = r['latency_ms']
+            if not old or not new or old[metric] <= 0:
+                continue
+            ratio = new[metric] / old[metric]
+            flag = ""
+            if ratio > 1 + threshold:
+                regressions.append((section, name, ratio))
+                flag = "  <-- REGRESIÓN"
+            print(f"{section:<8} {name:<18} {old[metric]:>9.3f} -> {new[metric]:>9.3f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline routing and KD-tree benchmark on a synthetic graph.")
+    parser.add_argument("--graph", choices=synthetic_city.KINDS, default="grid", help="Synthetic city layout")
+    parser.add_argument("--nodes", type=int, default=3600, help="Approximate number of intersections")
+    parser.add_argument("--pairs", type=int, default=20, help="Origin/destination pairs for routing")
+    parser.add_argument("--queries", type=int, default=500, help="Random points for the KD-tree")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slow", action="store_true", help="Also run BFS, DFS and IDDFS")
+    parser.add_argument("--csr-only", action="store_true",
+                        help="Skip networkx and the searches that need it (for 1M+ node graphs)")
+    parser.add_argument("--no-ch", action="store_true", help="Skip the Contraction Hierarchy")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    report = run_suite(args.graph, args.nodes, args.pairs, args.queries, args.repeats, args.warmup, args.seed, args.slow,
+                       csr_only=args.csr_only, with_ch=not args.no_ch)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReporte escrito en {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Non-zero exit code so CI can fail on regressions
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
@@ -1,3 +1,4 @@
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
@@ -175,4 +176,250 @@ class KDTree:
             idx = None
 
         return (best['dist'] ** 0.5, idx)
-    
\ No newline at end of file
+
+
+class ArrayKDTree:
+    """
+    KD-Tree stored in flat NumPy arrays, meant for snapping many points at once.
+
+    Nodes are split at the median with `argpartition` (alternating x/y like KDTree)
+    until at most `leaf_size` points remain, which are kept together as a leaf bucket.
+    Queries return indices into the original `points` array.
+    """
+
+    def __init__(self, points, leaf_size=16):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.leaf_size = max(1, int(leaf_size))
+        self._build()
+        # Plain-list copy of the node arrays for single-point queries, built on first use
+        self._lists = None
+
+    def _build(self):
+        n = len(self.points)
+        perm = np.arange(n)
+
+        split_axis, split_value, left, right, start, count = [], [], [], [], [], []
+
+        def new_node(lo, hi):
+            split_axis.append(-1)
+            split_value.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            start.append(lo)
+            count.append(hi - lo)
+            return len(split_axis) - 1
+
+        if n > 0:
+            # Iterative build, every stack entry is (node, lo, hi, depth) over perm[lo:hi]
+            stack = [(new_node(0, n), 0, n, 0)]
+            while stack:
+                node, lo, hi, depth = stack.pop()
+                if hi - lo <= self.leaf_size:
+                    continue
+
+                axis = depth % 2
+                mid = (hi - lo) // 2
+                chunk = perm[lo:hi]
+                order = np.argpartition(self.points[chunk, axis], mid)
+                perm[lo:hi] = chunk[order]
+
+                split_axis[node] = axis
+                split_value[node] = self.points[perm[lo + mid], axis]
+                left[node] = new_node(lo, lo + mid)
+                right[node] = new_node(lo + mid, hi)
+                stack.append((left[node], lo, lo + mid, depth + 1))
+                stack.append((right[node], lo + mid, hi, depth + 1))
+
+        self.split_axis = np.array(split_axis, dtype=np.int8)
+        self.split_value = np.array(split_value, dtype=np.float64)
+        self.left = np.array(left, dtype=np.int32)
+        self.right = np.array(right, dtype=np.int32)
+        self.start = np.array(start, dtype=np.int64)
+        self.count = np.array(count, dtype=np.int64)
+        self.is_leaf = self.split_axis < 0
+
+        # Points reordered so every leaf is a contiguous block
+        self.indices = perm
+        self.sorted_points = self.points[perm]
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, target):
+        """Return (distance, index) of the nearest point, or (None, None) if the tree is empty."""
+        if len(self.points) == 0:
+            return (None, None)
+        d2, idx = self._query_one(float(target[0]), float(target[1]))
+        return (d2 ** 0.5, idx)
+
+    def closest_point(self, target):
+        """Return the nearest stored point as a tuple, or None if the tree is empty."""
+        _, idx = self.query(target)
+        if idx is None:
+            return None
+        return tuple(self.points[idx].tolist())
+
+    def _query_one(self, tx, ty):
+        # Single point (a click): depth-first walk over plain lists, the array machinery of
+        # query_batch costs more than the whole search for one query
+        if self._lists is None:
+            self._lists = (self.split_axis.tolist(), self.split_value.tolist(), self.left.tolist(),
+                           self.right.tolist(), self.start.tolist(), self.count.tolist())
+        split_axis, split_value, left, right, start, count = self._lists
+        points = self.sorted_points
+
+        best_d2, best = float('inf'), -1
+        # Stack of (node, lower bound of the squared distance to its cell)
+        stack = [(0, 0.0)]
+        while stack:
+            node, lb = stack.pop()
+            if lb > best_d2:
+                continue
+            axis = split_axis[node]
+            if axis < 0:
+                a = start[node]
+                d = points[a:a + count[node]] - (tx, ty)
+                d2 = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+                j = int(d2.argmin())
+                if d2[j] < best_d2:
+                    best_d2, best = float(d2[j]), a + j
+                continue
+            diff = (tx if axis == 0 else ty) - split_value[node]
+            if diff <= 0:
+                near, far = left[node], right[node]
+            else:
+                near, far = right[node], left[node]
+            # Far side first on the stack, so the near side is searched first
+            stack.append((far, max(lb, diff * diff)))
+            stack.append((near, lb))
+        return best_d2, int(self.indices[best])
+
+    def query_batch(self, points, k=1, chunk_size=4096):
+        """
+        Nearest neighbours for many points at once.
+
+        Returns (distances, indices). With k=1 both have shape (m,), otherwise (m, k)
+        sorted by distance. Missing neighbours (k larger than the tree) get inf / -1.
+        """
+        Q = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        m = len(Q)
+        k = int(k)
+        if m == 1 and k == 1 and len(self.points) > 0:
+            d2, idx = self._query_one(float(Q[0, 0]), float(Q[0, 1]))
+            return np.array([d2 ** 0.5]), np.array([idx], dtype=np.int64)
+
+        best_d2 = np.full((m, k), np.inf)
+        best_idx = np.full((m, k), -1, dtype=np.int64)
+
+        if len(self.points) > 0:
+            for lo in range(0, m, chunk_size):
+                hi = min(lo + chunk_size, m)
+                self._query_chunk(Q[lo:hi], k, best_d2[lo:hi], best_idx[lo:hi])
+
+        dist = np.sqrt(best_d2)
+        if k == 1:
+            return dist[:, 0], best_idx[:, 0]
+        return dist, best_idx
+
+    def _query_chunk(self, Q, k, best_d2, best_idx):
+        m = len(Q)
+        n = len(self.points)
+        rows = np.arange(m)
+
+        # 1. Greedy descent to the leaf that contains each query
+        node = np.zeros(m, dtype=np.int64)
+        active = ~self.is_leaf[node]
+        while active.any():
+            q = rows[active]
+            nd = node[q]
+            go_left = Q[q, self.split_axis[nd]] <= self.split_value[nd]
+            node[q] = np.where(go_left, self.left[nd], self.right[nd])
+            active = ~self.is_leaf[node]
+        home_leaf = node
+
+        # 2. First bound from k real points: a window of the reordered points that holds the
+        # home leaf. Neighbouring positions are neighbouring cells, so the bound is tight even
+        # when k is larger than a leaf, and the walk below prunes from the start
+        width = min(max(k, self.leaf_size), n)
+        w_lo = np.minimum(self.start[home_leaf], n - width)
+        w_hi = w_lo + width
+        pos = w_lo[:, None] + np.arange(width)[None, :]
+        cand = self.sorted_points[pos]
+        d2 = (cand[..., 0] - Q[:, 0][:, None]) ** 2 + (cand[..., 1] - Q[:, 1][:, None]) ** 2
+        top = np.argsort(d2, axis=1)[:, :k]
+        best_d2[:, :top.shape[1]] = np.take_along_axis(d2, top, axis=1)
+        best_idx[:, :top.shape[1]] = self.indices[np.take_along_axis(pos, top, axis=1)]
+        if width == n:
+            return
+
+        # 3. Level by level walk over (query, node) pairs, pruning with the current k-th best.
+        # lb is a lower bound of the squared distance from the query to the node's cell
+        qs = rows
+        ns = np.zeros(m, dtype=np.int64)
+        lb = np.zeros(m)
+        while len(qs):
+            keep = lb <= best_d2[qs, k - 1]
+            qs, ns, lb = qs[keep], ns[keep], lb[keep]
+
+            leaf = self.is_leaf[ns]
+            if leaf.any():
+                # Leaves that lie inside the window were already scanned in step 2
+                a = self.start[ns]
+                fresh = leaf & ((a < w_lo[qs]) | (a + self.count[ns] > w_hi[qs]))
+                if fresh.any():
+                    self._scan_leaves(Q, qs[fresh], ns[fresh], k, best_d2, best_idx, w_lo, w_hi)
+                qs, ns, lb = qs[~leaf], ns[~leaf], lb[~leaf]
+                if not len(qs):
+                    break
+
+            diff = Q[qs, self.split_axis[ns]] - self.split_value[ns]
+            near = np.where(diff <= 0, self.left[ns], self.right[ns])
+            far = np.where(diff <= 0, self.right[ns], self.left[ns])
+            qs = np.concatenate((qs, qs))
+            ns = np.concatenate((near, far))
+            lb = np.concatenate((lb, np.maximum(lb, diff * diff)))
+
+    def _scan_leaves(self, Q, qs, leaves, k, best_d2, best_idx, w_lo, w_hi):
+        # Candidates padded to leaf_size, padding and the points of the query's window
+        # (already in its best list) get an infinite distance
+        offs = np.arange(self.leaf_size)
+        pos = self.start[leaves][:, None] + offs[None, :]
+        valid = offs[None, :] < self.count[leaves][:, None]
+        valid &= (pos < w_lo[qs][:, None]) | (pos >= w_hi[qs][:, None])
+        pos = np.where(valid, pos, 0)
+
+        cand = self.sorted_points[pos]
+        d2 = (cand[..., 0] - Q[qs, 0][:, None]) ** 2 + (cand[..., 1] - Q[qs, 1][:, None]) ** 2
+        d2 = np.where(valid, d2, np.inf)
+        cand_idx = np.where(valid, self.indices[pos], -1)
+
+        if k == 1:
+            # Several leaves of the same query can be scanned together, keep the minimum
+            j = np.argmin(d2, axis=1)
+            d_min = d2[np.arange(len(qs)), j]
+            i_min = cand_idx[np.arange(len(qs)), j]
+            order = np.lexsort((d_min, qs))
+            qs_sorted = qs[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = qs_sorted[1:] != qs_sorted[:-1]
+            q = qs_sorted[first]
+            d = d_min[order][first]
+            better = d < best_d2[q, 0]
+            best_d2[q[better], 0] = d[better]
+            best_idx[q[better], 0] = i_min[order][first][better]
+            return
+
+        # General k: merge current best rows with the new candidates and keep the k smallest
+        touched = np.unique(qs)
+        all_q = np.concatenate((np.repeat(qs, self.leaf_size), np.repeat(touched, k)))
+        all_d = np.concatenate((d2.ravel(), best_d2[touched].ravel()))
+        all_i = np.concatenate((cand_idx.ravel(), best_idx[touched].ravel()))
+
+        order = np.lexsort((all_d, all_q))
+        all_q, all_d, all_i = all_q[order], all_d[order], all_i[order]
+        group_start = np.flatnonzero(np.r_[True, all_q[1:] != all_q[:-1]])
+        rank = np.arange(len(all_q)) - np.repeat(group_start, np.diff(np.r_[group_start, len(all_q)]))
+        top = rank < k
+        best_d2[all_q[top], rank[top]] = all_d[top]
+        best_idx[all_q[top], rank[top]] = all_i[top]
+
@@ -0,0 +1,229 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+class CSRGraph:
+    """
+    Frozen, array-backed copy of a projected OSMnx graph.
+
+    Out-edges of the node with index i are targets[offsets[i]:offsets[i+1]] with
+    weights lengths[offsets[i]:offsets[i+1]]. Parallel edges are collapsed to the
+    shortest one. `node_ids[i]` gives the OSM id and `index[osm_id]` the way back.
+    `weights` holds one float32 array per weight profile ('length', 'time', ...),
+    all aligned with `targets`, so switching profile needs no copy of the graph.
+    """
+
+    def __init__(self, node_ids, x, y, offsets, targets, lengths, crs=None, index=None, weights=None, weight='length'):
+        self.node_ids = node_ids
+        if index is None:
+            index = {nid: i for i, nid in enumerate(node_ids.tolist())}
+        self.index = index
+        self.x = x
+        self.y = y
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths = lengths
+        self.weight = weight
+        self.weights = weights if weights is not None else {weight: lengths}
+        self.crs = crs
+        self._matrices = {}
+        self._reversed = {}
+        self._lists = {}
+        self._reversed_lists = {}
+        self._target_ids = None
+        self._source_ids = None
+
+    @classmethod
+    def from_networkx(cls, G, weight='length', profiles=None):
+        """
+        `profiles` is an optional {name: function(edge data) -> cost} dict, every
+        profile becomes one more array in `weights` next to the `weight` attribute.
+        """
+        node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+        index = {nid: i for i, nid in enumerate(node_ids.tolist())}
+
+        x = np.fromiter((d['x'] for _, d in G.nodes(data=True)), dtype=np.float64, count=len(node_ids))
+        y = np.fromiter((d['y'] for _, d in G.nodes(data=True)), dtype=np.float64, count=len(node_ids))
+
+        profiles = profiles or {}
+        names = [weight] + [name for name in profiles if name != weight]
+        functions = [profiles[name] for name in names[1:]]
+
+        m = G.number_of_edges()
+        src = np.empty(m, dtype=np.int32)
+        dst = np.empty(m, dtype=np.int32)
+        w = np.empty((len(names), m), dtype=np.float32)
+        for k, (u, v, data) in enumerate(G.edges(data=True)):
+            src[k] = index[u]
+            dst[k] = index[v]
+            w[0, k] = data.get(weight, 1)
+            for j, function in enumerate(functions, 1):
+                w[j, k] = function(data)
+
+        # Sort by (source, target, weight) and keep one entry for every (u, v) run.
+        # Each profile keeps its own minimum among the parallel edges
+        order = np.lexsort((w[0], dst, src))
+        src, dst, w = src[order], dst[order], w[:, order]
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        starts = np.flatnonzero(keep)
+        if m:
+            w = np.minimum.reduceat(w, starts, axis=1)
+        src, dst = src[starts], dst[starts]
+
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=offsets[1:])
+
+        weights = {name: w[j] for j, name in enumerate(names)}
+        return cls(node_ids, x, y, offsets, dst, weights[weight], crs=G.graph.get('crs'), index=index,
+                   weights=weights, weight=weight)
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def neighbors(self, node):
+        """OSM ids of the out-neighbours of `node`, same as `G.neighbors` in networkx. Closed edges are skipped."""
+        offsets, target_ids, costs = self.flat_lists()
+        i = self.index[node]
+        a, b = offsets[i], offsets[i + 1]
+        return [t for t, cost in zip(target_ids[a:b], costs[a:b]) if cost != np.inf]
+
+    def expand_fn(self, weight=None, reverse=False):
+        """
+        Function node -> [(neighbour OSM id, cost)] for the pure-Python searches, over the
+        out-edges or, with `reverse`, the in-edges. It slices flat lists aligned with the
+        edges instead of keeping a list per node, and the lists are patched by
+        set_edge_weight, so closed edges show up with an infinite cost.
+        """
+        offsets, target_ids, costs = self.flat_lists(weight, reverse)
+        index = self.index
+
+        def expand(node):
+            i = index[node]
+            a = offsets[i]
+            b = offsets[i + 1]
+            return list(zip(target_ids[a:b], costs[a:b]))
+        return expand
+
+    def flat_lists(self, weight=None, reverse=False):
+        """(offsets, target OSM ids, costs) as plain lists, built once per weight and direction."""
+        weight = weight or self.weight
+        if not reverse:
+            offsets, _, costs = self.as_lists(weight)
+            if self._target_ids is None:
+                self._target_ids = self.node_ids[self.targets].tolist()
+            return offsets, self._target_ids, costs
+        # The transposed matrices of every weight share one structure, only the costs differ
+        if weight not in self._reversed_lists:
+            matrix = self.to_scipy_reversed(weight)
+            if self._source_ids is None:
+                self._source_ids = self.node_ids[matrix.indices].tolist()
+            self._reversed_lists[weight] = (matrix.indptr.tolist(), matrix.data.tolist())
+        offsets, costs = self._reversed_lists[weight]
+        return offsets, self._source_ids, costs
+
+    def coords(self, node):
+        i = self.index[node]
+        return self.x[i], self.y[i]
+
+    def coords_of(self, nodes):
+        """x and y arrays for a sequence of OSM ids."""
+        idx = np.fromiter((self.index[n] for n in nodes), dtype=np.int64)
+        return self.x[idx], self.y[idx]
+
+    def to_scipy(self, weight=None):
+        # Built lazily per weight profile, all matrices share the offsets/targets arrays
+        weight = weight or self.weight
+        if weight not in self._matrices:
+            n = len(self.node_ids)
+            self._matrices[weight] = csr_matrix((self.weights[weight], self.targets, self.offsets), shape=(n, n))
+        return self._matrices[weight]
+
+    def to_scipy_reversed(self, weight=None):
+        # Transposed matrix: its out-edges are the in-edges of the road graph
+        weight = weight or self.weight
+        if weight not in self._reversed:
+            self._reversed[weight] = self.to_scipy(weight).transpose().tocsr()
+        return self._reversed[weight]
+
+    def as_lists(self, weight=None):
+        """(offsets, targets, weights) as plain lists, for pure-Python searches that index them per edge."""
+        weight = weight or self.weight
+        if weight not in self._lists:
+            self._lists[weight] = (self.offsets.tolist(), self.targets.tolist(), self.weights[weight].tolist())
+        return self._lists[weight]
+
+    def edge_position(self, u, v):
+        """Position of edge u -> v in `targets`/`weights`, or None if the graph has no such edge."""
+        i = self.index[u]
+        j = self.index[v]
+        a, b = self.offsets[i], self.offsets[i + 1]
+        hits = np.flatnonzero(self.targets[a:b] == j)
+        return int(a + hits[0]) if len(hits) else None
+
+    def set_edge_weight(self, u, v, value, weight=None):
+        """
+        Change the cost of edge u -> v in place, np.inf closes it. The cached scipy matrices
+        and lists are patched too, so nothing is rebuilt. Returns the previous value.
+        """
+        weight = weight or self.weight
+        k = self.edge_position(u, v)
+        if k is None:
+            raise KeyError(f"No edge {u} -> {v}")
+        weights = self.weights[weight]
+        old = float(weights[k])
+        weights[k] = value
+
+        matrix = self._matrices.get(weight)
+        if matrix is not None and not np.shares_memory(matrix.data, weights):
+            matrix.data[k] = value
+        reversed_matrix = self._reversed.get(weight)
+        if reversed_matrix is not None:
+            i, j = self.index[u], self.index[v]
+            a, b = reversed_matrix.indptr[j], reversed_matrix.indptr[j + 1]
+            r = a + np.flatnonzero(reversed_matrix.indices[a:b] == i)[0]
+            reversed_matrix.data[r] = value
+            reversed_lists = self._reversed_lists.get(weight)
+            if reversed_lists is not None:
+                reversed_lists[1][r] = float(weights[k])
+        lists = self._lists.get(weight)
+        if lists is not None:
+            lists[2][k] = float(weights[k])
+        return old
+
+    def path_from_predecessors(self, predecessors, source_idx, target_idx):
+        """Walk a scipy predecessor array back from target to source, returns OSM ids or None."""
+        if source_idx != target_idx and predecessors[target_idx] < 0:
+            return None
+        path = [target_idx]
+        while path[-1] != source_idx:
+            path.append(predecessors[path[-1]])
+        path.reverse()
+        return self.node_ids[path].tolist()
+
+    def nbytes(self):
+        """Bytes held by the graph arrays, without the lazily built matrices and lists."""
+        arrays = [self.node_ids, self.x, self.y, self.offsets, self.targets] + list(self.weights.values())
+        return sum(a.nbytes for a in arrays)
+
+
+def shortest_path(graph, source, target, weight=None, stats=None):
+    """
+    Dijkstra over the CSR arrays. Returns the route as a list of OSM ids or None.
+    With a `stats` dict, stats['expanded'] gets the number of nodes the search reached.
+    """
+    s = graph.index[source]
+    t = graph.index[target]
+    dist, pred = dijkstra(graph.to_scipy(weight), directed=True, indices=s, return_predecessors=True)
+    if stats is not None:
+        stats['expanded'] = int(np.count_nonzero(np.isfinite(dist)))
+    if not np.isfinite(dist[t]):
+        return None
+    return graph.path_from_predecessors(pred, s, t)
@@ -0,0 +1,271 @@
+import heapq
+import threading
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+
+class HospitalDistanceField:
+    """
+    Network distance from every node to its nearest hospital.
+
+    Built with one multi-source Dijkstra over the reversed graph, so for every
+    node index v we know:
+      - nearest[v]: index (into hospitals_nodes) of the closest hospital by road, -1 if unreachable
+      - dist[v]: cost to reach that hospital (meters, or seconds for time weights)
+      - next_hop[v]: next node index on the way to that hospital, -1 at the hospital itself
+    A route is then just following next_hop until we reach the hospital.
+    The three arrays are read and repaired under one lock, so a route never mixes
+    entries from before and after an edge update.
+    """
+
+    def __init__(self, graph, hospitals_nodes, weight=None):
+        self.graph = graph
+        self.weight = weight or graph.weight
+        self.hospitals_nodes = np.asarray(hospitals_nodes, dtype=np.int64)
+        self._lock = threading.Lock()
+
+        # Several hospitals can snap to the same street node, the first one keeps it
+        hosp_idx = np.array([graph.index[n] for n in self.hospitals_nodes.tolist()], dtype=np.int64)
+        source_idx, first = np.unique(hosp_idx, return_index=True)
+        hospital_of_source = np.full(graph.number_of_nodes(), -1, dtype=np.int32)
+        hospital_of_source[source_idx] = first
+
+        if len(source_idx) == 0:
+            n = graph.number_of_nodes()
+            self.dist = np.full(n, np.inf, dtype=np.float32)
+            self.next_hop = np.full(n, -1, dtype=np.int32)
+            self.nearest = np.full(n, -1, dtype=np.int32)
+            return
+
+        # Searching from the hospitals on the reversed graph gives distances *to* them,
+        # and the reversed-graph predecessor of v is its successor on the real route
+        dist, pred, sources = dijkstra(
+            graph.to_scipy_reversed(self.weight), directed=True, indices=source_idx,
+            return_predecessors=True, min_only=True,
+        )
+
+        self.dist = dist.astype(np.float32)
+        self.next_hop = np.where(pred < 0, -1, pred).astype(np.int32)
+        self.nearest = np.where(sources < 0, -1, hospital_of_source[np.maximum(sources, 0)]).astype(np.int32)
+
+    def nearest_hospital(self, origin_node):
+        """Return (hospital index, cost) for an OSM node, or (None, None) if unreachable."""
+        i = self.graph.index[origin_node]
+        with self._lock:
+            h = int(self.nearest[i])
+            d = float(self.dist[i])
+        if h < 0:
+            return None, None
+        return h, d
+
+    def route(self, origin_node):
+        """
+        Route from `origin_node` to its nearest hospital by following the stored pointers.
+        Returns (route as OSM ids, hospital node, distance) or (None, None, None).
+        """
+        i = self.graph.index[origin_node]
+        with self._lock:
+            h = int(self.nearest[i])
+            if h < 0:
+                return None, None, None
+            d = float(self.dist[i])
+
+            path = [i]
+            next_hop = self.next_hop
+            while next_hop[path[-1]] >= 0:
+                path.append(int(next_hop[path[-1]]))
+
+        return self.graph.node_ids[path].tolist(), int(self.hospitals_nodes[h]), d
+
+    def route_batch(self, origin_nodes):
+        """
+        Same as `route` for many origins. Hospital and distance lookups are vectorized,
+        only the pointer walks run per origin. Returns a list of (route, hospital node, distance).
+        """
+        index = self.graph.index
+        idx = np.fromiter((index[n] for n in origin_nodes), dtype=np.int64)
+        with self._lock:
+            nearest = self.nearest[idx]
+            dist = self.dist[idx]
+            # A plain list is much faster than NumPy scalar indexing for the walks
+            next_hop = self.next_hop.tolist()
+        hosp_nodes = self.hospitals_nodes[np.maximum(nearest, 0)] if len(self.hospitals_nodes) else nearest
+
+        node_ids = self.graph.node_ids
+        results = []
+        for i, h, d, hn in zip(idx.tolist(), nearest.tolist(), dist.tolist(), hosp_nodes.tolist()):
+            if h < 0:
+                results.append((None, None, None))
+                continue
+            path = [i]
+            while next_hop[path[-1]] >= 0:
+                path.append(next_hop[path[-1]])
+            results.append((node_ids[path].tolist(), hn, d))
+        return results
+
+    def update_edge(self, u, v, old, new):
+        """
+        Repair the field after edge u -> v (OSM ids) went from cost `old` to `new`. The graph
+        must already hold the new cost. Only nodes whose route can change are searched again,
+        so a closure costs a small local Dijkstra instead of a new multi-source one.
+        The repair holds the field's lock, so `route`, `route_batch` and `nearest_hospital`
+        wait for it instead of seeing a half-repaired route. Returns the indices of the
+        nodes whose entry changed.
+        """
+        with self._lock:
+            return self._update_edge(u, v, old, new)
+
+    def _update_edge(self, u, v, old, new):
+        graph = self.graph
+        i, j = graph.index[u], graph.index[v]
+        # Repaired entries, node index -> (cost, next hop, hospital); other nodes keep the arrays
+        repaired = {}
+        heap = []
+
+        def cost(x):
+            entry = repaired.get(x)
+            return entry[0] if entry is not None else float(self.dist[x])
+
+        if new > old:
+            # Only the nodes whose route runs through u -> v can get worse
+            if self.next_hop[i] != j:
+                return []
+            affected = self._subtree(i)
+            for a in affected:
+                repaired[a] = (np.inf, -1, -1)
+            # Seed each of them with its best way out through a node that kept its route
+            offsets, targets, weights = graph.offsets, graph.targets, graph.weights[self.weight]
+            for a in affected:
+                for k in range(offsets[a], offsets[a + 1]):
+                    b = int(targets[k])
+                    d = float(weights[k]) + cost(b)
+                    if d < repaired[a][0] and b not in repaired:
+                        repaired[a] = (d, b, int(self.nearest[b]))
+                if np.isfinite(repaired[a][0]):
+                    heapq.heappush(heap, (repaired[a][0], a))
+        elif new < old:
+            d = float(new) + cost(j)
+            if not np.float32(d) < self.dist[i]:
+                return []
+            repaired[i] = (d, j, int(self.nearest[j]))
+            heapq.heappush(heap, (d, i))
+        else:
+            return []
+
+        # Dijkstra over the in-edges from the repaired nodes, same as the initial build
+        rev = graph.to_scipy_reversed(self.weight)
+        indptr, indices, data = rev.indptr, rev.indices, rev.data
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > repaired[x][0]:
+                continue
+            hospital = repaired[x][2]
+            for k in range(indptr[x], indptr[x + 1]):
+                y = int(indices[k])
+                nd = d + float(data[k])
+                if np.float32(nd) < np.float32(cost(y)):
+                    repaired[y] = (nd, x, hospital)
+                    heapq.heappush(heap, (nd, y))
+
+        changed = np.fromiter(repaired, dtype=np.int64, count=len(repaired))
+        values = list(repaired.values())
+        self.dist[changed] = [d for d, _, _ in values]
+        self.next_hop[changed] = [n for _, n, _ in values]
+        self.nearest[changed] = [h for _, _, h in values]
+        return sorted(repaired)
+
+    def _subtree(self, i):
+        """Node indices whose pointer walk passes through node index i (i included)."""
+        rev = self.graph.to_scipy_reversed(self.weight)
+        next_hop = self.next_hop
+        subtree = [i]
+        stack = [i]
+        while stack:
+            c = stack.pop()
+            # Children of c in the shortest-path tree are its predecessors that point to it
+            for x in rev.indices[rev.indptr[c]:rev.indptr[c + 1]].tolist():
+                if next_hop[x] == c:
+                    subtree.append(x)
+                    stack.append(x)
+        return subtree
+
+    def k_nearest(self, origin_node, k=3, capacity=None, penalty=None, budget=None):
+        """Same as `k_nearest_hospitals` with this field's graph, hospitals and weight."""
+        return k_nearest_hospitals(self.graph, self.hospitals_nodes, origin_node, k=k, weight=self.weight,
+                                   capacity=capacity, penalty=penalty, budget=budget)
+
+
+def k_nearest_hospitals(graph, hospitals_nodes, origin_node, k=3, weight=None, capacity=None, penalty=None,
+                        budget=None):
+    """
+    The `k` best hospitals for `origin_node`, ranked by network cost, from one Dijkstra
+    that stops as soon as the ranking cannot change (no separate search per hospital).
+
+    - capacity[h]: free slots of hospital h, hospitals with capacity <= 0 are skipped
+    - penalty[h]: extra cost added to hospital h (same units as the weight, e.g. a
+      waiting time in seconds), so a busy hospital can rank below a farther one
+
+    Returns a list of (hospital index, route as OSM ids, cost, score) sorted by
+    score = cost + penalty. Unreachable hospitals are not in the list. If the optional
+    `budget` (a SearchBudget) runs out, only the hospitals whose rank was already
+    final are returned.
+    """
+    offsets, targets, weights = graph.as_lists(weight)
+
+    # Several hospitals can share a street node
+    hospitals_at = {}
+    for h, node in enumerate(np.asarray(hospitals_nodes, dtype=np.int64).tolist()):
+        if capacity is not None and capacity[h] <= 0:
+            continue
+        hospitals_at.setdefault(graph.index[node], []).append(h)
+    k = min(k, sum(len(hs) for hs in hospitals_at.values()))
+
+    source = graph.index[origin_node]
+    dist = {source: 0.0}
+    parents = {source: None}
+    pq = [(0.0, source)]
+    found = []
+    d = 0.0
+    iterations = 0
+    # Without a budget next_check stays -1 and is never reached
+    next_check = budget.first_check() if budget is not None else -1
+    while pq and k:
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None:
+                # Hospitals scoring above d could still be beaten by one not found yet
+                found = [item for item in found if item[0] <= d]
+                break
+        iterations += 1
+
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+
+        for h in hospitals_at.get(u, ()):
+            extra = float(penalty[h]) if penalty is not None else 0.0
+            found.append((d + extra, h, u, d))
+
+        # Penalties are >= 0, so every hospital still in the queue scores at least d:
+        # once k of the found ones score <= d the top k are final
+        if len(found) >= k and sorted(score for score, _, _, _ in found)[k - 1] <= d:
+            break
+
+        for j in range(offsets[u], offsets[u + 1]):
+            v = targets[j]
+            nd = d + weights[j]
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                parents[v] = u
+                heapq.heappush(pq, (nd, v))
+
+    node_ids = graph.node_ids
+    results = []
+    for score, h, u, d in sorted(found)[:k]:
+        path = []
+        while u is not None:
+            path.append(u)
+            u = parents[u]
+        path.reverse()
+        results.append((h, node_ids[path].tolist(), d, score))
+    return results
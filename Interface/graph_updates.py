@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class GraphUpdates:
+    """
+    Edge closures and cost changes applied in place to a loaded CSRGraph.
+
+    Every change patches the weight arrays and repairs the HospitalDistanceField of
+    that weight locally (see `HospitalDistanceField.update_edge`), nothing is rebuilt.
+    The original cost of every touched edge is kept, so changes can be undone and
+    other processes can replay the same state with `sync`.
+    """
+
+    def __init__(self, graph, fields=None):
+        self.graph = graph
+        # {weight name: HospitalDistanceField}
+        self.fields = fields or {}
+        # {(u, v, weight): original cost} and {(u, v, weight): current cost} of the changed edges
+        self.original = {}
+        self.current = {}
+
+    def set_weight(self, u, v, weight, value):
+        """
+        Set the cost of edge u -> v for one weight profile (np.inf closes it).
+        Returns the indices of the nodes whose hospital, distance or next hop changed.
+        """
+        key = (u, v, weight)
+        old = self.graph.set_edge_weight(u, v, value, weight=weight)
+        self.original.setdefault(key, old)
+        if value == self.original[key]:
+            # Back to the original cost, nothing to remember
+            del self.original[key]
+            self.current.pop(key, None)
+        else:
+            self.current[key] = float(value)
+
+        field = self.fields.get(weight)
+        if field is None:
+            return []
+        return field.update_edge(u, v, old, value)
+
+    def close_edge(self, u, v):
+        """Close edge u -> v for every weight profile. Returns {weight: changed node indices}."""
+        return {weight: self.set_weight(u, v, weight, np.inf) for weight in self.graph.weights}
+
+    def restore(self, u, v, weight=None):
+        """
+        Undo every change on edge u -> v (only for `weight` when given).
+        Returns {weight: changed node indices}.
+        """
+        weights = [weight] if weight is not None else list(self.graph.weights)
+        return {
+            w: self.set_weight(u, v, w, self.original[(u, v, w)])
+            for w in weights if (u, v, w) in self.original
+        }
+
+    def modified_weights(self):
+        """Weight profiles with at least one edge that differs from the loaded graph."""
+        return {weight for _, _, weight in self.current}
+
+    def changes(self):
+        """{(u, v, weight): current cost} of every edge that differs from the loaded graph."""
+        return dict(self.current)
+
+    def sync(self, changes):
+        """Apply or undo whatever is needed so this graph matches `changes` (from `changes()`)."""
+        for u, v, weight in [key for key in self.current if key not in changes]:
+            self.restore(u, v, weight)
+        for (u, v, weight), value in changes.items():
+            if self.current.get((u, v, weight)) != value:
+                self.set_weight(u, v, weight, value)
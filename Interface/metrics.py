@@ -0,0 +1,135 @@
+import bisect
+import threading
+
+# Seconds, from sub-millisecond lookups to searches that hit the timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Node counts (nodes expanded, nodes in a route)
+COUNT_BUCKETS = (1, 10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+
+def _labels(label, value, extra=""):
+    parts = []
+    if label is not None:
+        parts.append(f'{label}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """
+    Prometheus histogram with at most one label. Observations are kept as per-bucket
+    counts plus sum and count, so memory does not grow with traffic.
+    """
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        # {label value: [count per bucket (+Inf last), sum, count]}
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            # Buckets are "less or equal", bisect_left gives the first bound >= value
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def means(self):
+        """{label value: mean of the observations}."""
+        with self._lock:
+            return {key: total / count for key, (_, total, count) in self.series.items() if count}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.series.items(), key=lambda item: str(item[0])):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float('inf') else _number(bound)
+                    bucket = _labels(self.label, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label, key)} {total!r}")
+                lines.append(f"{self.name}_count{_labels(self.label, key)} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with at most one label."""
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self._lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+                lines.append(f"{self.name}{_labels(self.label, key)} {_number(value)}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Counter or gauge read at scrape time from `fn() -> {label value: number}`, for
+    values another object already tracks (cache hits, queue sizes...).
+    """
+
+    def __init__(self, name, help, fn, kind="gauge", label=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        self.label = label
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.fn().items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_labels(self.label, key)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    """Set of metrics rendered together in the Prometheus text format (version 0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        return self._add(Histogram(name, help, buckets, label))
+
+    def counter(self, name, help, label=None):
+        return self._add(Counter(name, help, label))
+
+    def callback(self, name, help, fn, kind="gauge", label=None):
+        return self._add(CallbackMetric(name, help, fn, kind, label))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,74 @@
+import numpy as np
+import shapely
+from Interface.distance_field import HospitalDistanceField
+
+# Margin (meters) around the road network used to close the outer regions
+REGION_MARGIN = 100.0
+
+
+class NetworkVoronoi:
+    """
+    Road-network Voronoi partition: every node belongs to the hospital it reaches
+    first by road, not to the closest one in a straight line.
+
+    `labels[i]` is the hospital index (into hospitals_nodes) that owns node index i,
+    -1 if no hospital is reachable. It is the `nearest` array of a
+    HospitalDistanceField, so building one from a field costs no extra search.
+    """
+
+    def __init__(self, graph, hospitals_nodes, labels):
+        self.graph = graph
+        self.hospitals_nodes = np.asarray(hospitals_nodes, dtype=np.int64)
+        self.labels = labels
+
+    @classmethod
+    def build(cls, graph, hospitals_nodes, weight=None):
+        """One multi-source Dijkstra from all hospitals over `graph` (a CSRGraph)."""
+        return cls.from_field(HospitalDistanceField(graph, hospitals_nodes, weight=weight))
+
+    @classmethod
+    def from_field(cls, field):
+        return cls(field.graph, field.hospitals_nodes, field.nearest)
+
+    def hospital_of(self, origin_node):
+        """Hospital index that owns `origin_node`, or None if it cannot reach any. O(1)."""
+        h = int(self.labels[self.graph.index[origin_node]])
+        return h if h >= 0 else None
+
+    def hospitals_of(self, origin_nodes):
+        """Vectorized `hospital_of`: int array with -1 for unreachable nodes."""
+        index = self.graph.index
+        return self.labels[np.fromiter((index[n] for n in origin_nodes), dtype=np.int64)]
+
+    def region_polygons(self, margin=REGION_MARGIN):
+        """
+        {hospital index: shapely (Multi)Polygon in the projected CRS} for every hospital
+        that owns at least one node.
+
+        Each node gets its Euclidean Voronoi cell among the *nodes* (not the hospitals),
+        and the cells are merged by label, so the borders follow the network partition.
+        The result is clipped to the hull of the network grown by `margin` meters.
+        """
+        points = np.column_stack((self.graph.x, self.graph.y))
+        # Nodes at the same position get a single cell, owned by the first of them
+        unique_points, first = np.unique(points, axis=0, return_index=True)
+        labels = self.labels[first]
+        if len(unique_points) < 2:
+            return {}
+
+        cells = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(unique_points), ordered=True))
+        hull = shapely.buffer(shapely.convex_hull(shapely.multipoints(unique_points)), margin)
+
+        order = np.argsort(labels, kind='stable')
+        sorted_labels = labels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+
+        regions = {}
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            h = int(sorted_labels[a])
+            if h < 0:
+                continue
+            # The cells tile the plane, so a coverage union is enough (much faster than union_all)
+            regions[h] = shapely.intersection(shapely.coverage_union_all(cells[order[a:b]]), hull)
+        return regions
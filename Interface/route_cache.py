@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of computed routes, keyed by (origin_node, hospital_node, weight).
+
+    Every entry keeps the route (OSM ids) and the GeoJSON already built for it.
+    Entries expire after `ttl` seconds (None means never) and the least recently
+    used one is dropped once `maxsize` is reached. Entries made stale by a graph
+    change are dropped by the caller with `invalidate`.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached entry dict for `key` or None, counting the hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry['created'] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, route, geojson=None):
+        """
+        Store a route and return its entry. `geojson` is an optional {variant: response} dict,
+        responses built later can be stored in the returned entry's 'geojson' dict.
+        """
+        with self._lock:
+            entry = {'route': route, 'geojson': {}, 'created': time.monotonic()}
+            if geojson is not None:
+                entry['geojson'].update(geojson)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only those whose key makes `predicate(key)` true."""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
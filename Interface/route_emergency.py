@@ -1,7 +1,13 @@
+import time
 import osmnx as ox
 import numpy as np
 import networkx as nx
-from Interface.KDTree import KDTree
+from Interface.KDTree import ArrayKDTree
+from Interface.csr_graph import CSRGraph
+from Interface.network_voronoi import NetworkVoronoi
+from Interface.distance_field import k_nearest_hospitals
+from Route_Planning.Uninformed_Agorithm import bidirectional_ucs_search
+import Interface.speed_profiles as speed_profiles
 from scipy.spatial import Voronoi, voronoi_plot_2d
 import matplotlib.pyplot as plt
 
@@ -9,6 +15,8 @@ def bring_map_data(place: str):
     print("Downloading map data...")
     G = ox.graph_from_address(place, dist=6000, network_type="drive")
     G_new = ox.project_graph(G)
+    # Travel times in seconds next to 'length', so routes can be weighted by time
+    G_new = speed_profiles.add_travel_times(G_new)
     return G_new
 
 def search_closests_hospitals(G, place: str):
@@ -83,35 +91,190 @@ def generate_voronoi(hospitals_coords, G):
     ax.axis('off')
     plt.show()
 
-def emergency_routing_system(G, hospitals_coords, hospitals_nodes, origin_node=None):
-    tree_hospitals = KDTree(hospitals_coords)
+def generate_network_voronoi(G, hospitals_coords, hospitals_nodes, weight='length'):
+    """Plot the road-network Voronoi partition: every node colored by the hospital it reaches first."""
+    if len(hospitals_nodes) == 0:
+        print("Cannot generate network Voronoi (No hospitals)")
+        return
+
+    print("Generating network Voronoi...")
+    graph = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    partition = NetworkVoronoi.build(graph, hospitals_nodes, weight=weight)
+    hospitals_coords = np.asarray(hospitals_coords)
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+
+    reached = partition.labels >= 0
+    ax.scatter(graph.x[~reached], graph.y[~reached], c='lightgray', s=1, alpha=0.5, label='Unreachable nodes')
+    ax.scatter(graph.x[reached], graph.y[reached], c=partition.labels[reached], cmap='tab20', s=1)
+
+    # Region borders, the same polygons the server sends as GeoJSON
+    for region in partition.region_polygons().values():
+        for polygon in getattr(region, 'geoms', [region]):
+            ax.plot(*polygon.exterior.xy, color='blue', linewidth=1, alpha=0.6)
+
+    ax.scatter(hospitals_coords[:,0], hospitals_coords[:,1], c='red', s=100, marker='P', label='Hospitals', zorder=5)
+
+    ax.set_title("Network Voronoi Partition: Hospital Areas by Road")
+    ax.legend()
+    ax.axis('off')
+    plt.show()
+
+class HospitalIndex:
+    """
+    KD-Tree over the hospital coordinates that lives as long as the server.
+    Queries return the position of the hospital in hospitals_coords/hospitals_nodes.
+    """
+
+    def __init__(self, hospitals_coords, hospitals_nodes):
+        self.coords = None
+        self.nodes = None
+        self.tree = None
+        self.update(hospitals_coords, hospitals_nodes)
+
+    def update(self, hospitals_coords, hospitals_nodes):
+        """Rebuild the tree only if the hospital set changed. Returns True if it was rebuilt."""
+        coords = np.asarray(hospitals_coords, dtype=np.float64).reshape(-1, 2)
+        nodes = np.asarray(hospitals_nodes, dtype=np.int64)
+        if self.tree is not None and np.array_equal(coords, self.coords) and np.array_equal(nodes, self.nodes):
+            return False
+
+        self.coords = coords
+        self.nodes = nodes
+        self.tree = ArrayKDTree(coords)
+        return True
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def query(self, target):
+        """Return (euclidean distance, hospital index) or (None, None) if there are no hospitals."""
+        return self.tree.query(target)
+
+    def query_batch(self, points, k=1):
+        return self.tree.query_batch(points, k=k)
+
+class NodeIndex:
+    """
+    KD-Tree over the street nodes of a CSRGraph, built once at startup to snap
+    clicks to the graph. Returns OSM node ids, same as ox.distance.nearest_nodes.
+    """
+
+    def __init__(self, graph):
+        self.node_ids = graph.node_ids
+        self.tree = ArrayKDTree(np.column_stack((graph.x, graph.y)))
+
+    def nearest(self, x, y):
+        """OSM id of the node closest to projected point (x, y)."""
+        _, idx = self.tree.query((x, y))
+        return int(self.node_ids[idx])
+
+    def nearest_batch(self, xs, ys):
+        """OSM ids of the nodes closest to many projected points, as an int64 array."""
+        points = np.column_stack((np.atleast_1d(xs), np.atleast_1d(ys)))
+        _, idx = self.tree.query_batch(points, k=1)
+        return self.node_ids[idx]
+
+def emergency_routing_system(G, hospitals_coords, hospitals_nodes, origin_node=None, field=None, hospital_index=None, ch=None,
+                             weight='length', partition=None, stats=None, budget=None):
+    # G can be the networkx graph or its CSRGraph copy (faster, less memory)
+    # `weight` is 'length' or one of the time profiles of speed_profiles ('time', 'time:hora_pico', ...)
+    # The hospital comes from `field` or `partition` (by road) when given, from the KDTree otherwise
+    # With a `stats` dict it gets the seconds per stage ('asignacion', 'busqueda'), the method
+    # that found the route and the nodes it expanded, for the server metrics
+    # `budget` (a SearchBudget) stops every search on a CSRGraph, only networkx runs to the end
+    is_csr = isinstance(G, CSRGraph)
+    if stats is not None:
+        stats['stages'] = {}
+    t0 = time.perf_counter()
     
     # If there's no origin node
     if origin_node is None:
-        node_ids = list(G.nodes())
+        node_ids = G.node_ids if is_csr else list(G.nodes())
         origin_node = node_ids[np.random.randint(len(node_ids))]
     
-    x_orig = G.nodes[origin_node]['x']
-    y_orig = G.nodes[origin_node]['y']
-    
-    # Search for the nearest hospital (Voronoi/KDTree)
-    dist, idx_hospital = tree_hospitals.query((x_orig, y_orig))
-    if idx_hospital is None:
-        if isinstance(hospitals_coords, np.ndarray) and hospitals_coords.size > 0:
-            d2 = (hospitals_coords[:,0] - x_orig) ** 2 + (hospitals_coords[:,1] - y_orig) ** 2
-            idx_hospital = int(np.argmin(d2))
+    # With a precomputed HospitalDistanceField the hospital is the nearest one by road
+    # and the route is a pointer walk, no search needed
+    if field is not None:
+        route, hospital_assigned_node, _ = field.route(origin_node)
+        if stats is not None:
+            stats['stages']['busqueda'] = time.perf_counter() - t0
+            stats['method'] = 'campo'
+            stats['expanded'] = 0
+        return route, hospital_assigned_node
+
+    if partition is not None:
+        # Network Voronoi: the hospital that owns the node by road, an O(1) array lookup
+        idx_hospital = partition.hospital_of(origin_node)
+        if idx_hospital is None:
+            return None, None
+        hospital_assigned_node = int(partition.hospitals_nodes[idx_hospital])
+    else:
+        # Reuse the caller's index, building one here is only for one-off scripts
+        if hospital_index is None:
+            hospital_index = HospitalIndex(hospitals_coords, hospitals_nodes)
+
+        if is_csr:
+            x_orig, y_orig = G.coords(origin_node)
         else:
+            x_orig = G.nodes[origin_node]['x']
+            y_orig = G.nodes[origin_node]['y']
+
+        # Search for the nearest hospital in a straight line (Euclidean Voronoi/KDTree)
+        dist, idx_hospital = hospital_index.query((x_orig, y_orig))
+        if idx_hospital is None:
             # No hospitals available
             return None, None
 
-    hospital_assigned_node = hospitals_nodes[int(idx_hospital)]
-    
-    # Calculate route
-    try:
-        route = nx.shortest_path(G, origin_node, hospital_assigned_node, weight='length')
+        hospital_assigned_node = int(hospital_index.nodes[idx_hospital])
+
+    t1 = time.perf_counter()
+    if stats is not None:
+        stats['stages']['asignacion'] = t1 - t0
+
+    # Calculate route, a Contraction Hierarchy answers without a full Dijkstra (built on lengths only)
+    if ch is not None and weight == 'length':
+        route = ch.shortest_path(origin_node, hospital_assigned_node, stats=stats, budget=budget)
+        method = 'ch'
+    elif is_csr:
+        # Bidirectional Dijkstra instead of scipy's: it settles far fewer nodes and honours the budget
+        route = bidirectional_ucs_search(G, origin_node, hospital_assigned_node, timeout=None, stats=stats,
+                                         budget=budget, weight=weight)
+        method = 'dijkstra'
+    else:
+        method = 'networkx'
+        try:
+            # Time profiles only exist as CSR arrays, on networkx all of them use plain travel time
+            attribute = speed_profiles.EDGE_ATTRIBUTES[weight.split(':')[0]]
+            route = nx.shortest_path(G, origin_node, hospital_assigned_node, weight=attribute)
+        except nx.NetworkXNoPath:
+            route = None
+
+    if route is not None:
+        if stats is not None:
+            stats['stages']['busqueda'] = time.perf_counter() - t1
+            stats['method'] = method
         return route, hospital_assigned_node
-    except nx.NetworkXNoPath:
+
+    if budget is not None and budget.reason is not None:
+        # Out of budget, the fallback below would stop at once too
+        if stats is not None:
+            stats['stages']['busqueda'] = time.perf_counter() - t1
+            stats['method'] = method
+        return None, None
+
+    # The straight-line hospital can be unreachable (one-way streets, a river), fall back
+    # to the closest hospital that the network does reach
+    graph = G if is_csr else CSRGraph.from_networkx(G, weight=speed_profiles.EDGE_ATTRIBUTES[weight.split(':')[0]])
+    best = k_nearest_hospitals(graph, hospitals_nodes, origin_node, k=1, weight=weight if is_csr else None,
+                               budget=budget)
+    if stats is not None:
+        stats['stages']['busqueda'] = time.perf_counter() - t1
+        stats['method'] = 'k_cercanos'
+    if not best:
         return None, None
+    idx_hospital, route, _, _ = best[0]
+    return route, int(hospitals_nodes[idx_hospital])
 
 if __name__ == "__main__":
     place = "Zapopan, Jalisco, Mexico"
@@ -119,4 +282,8 @@ if __name__ == "__main__":
     G, hosp_coords, hosp_nodes, _ = search_closests_hospitals(G, place)
     
     generate_voronoi(hosp_coords, G)
-    emergency_routing_system(G, hosp_coords, hosp_nodes)
\ No newline at end of file
+    generate_network_voronoi(G, hosp_coords, hosp_nodes)
+
+    # Hospital assignment by road, one multi-source Dijkstra for the whole map
+    partition = NetworkVoronoi.build(CSRGraph.from_networkx(G), hosp_nodes)
+    emergency_routing_system(G, hosp_coords, hosp_nodes, partition=partition)
\ No newline at end of file
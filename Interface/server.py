@@ -1,66 +1,715 @@
-from fastapi import FastAPI
+import os
+import hmac
+import time
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
 import Interface.route_emergency as engine
-import osmnx as ox
-import networkx as nx
+import Interface.snapshot as snapshot
+import Interface.workers as workers
+import Interface.speed_profiles as speed_profiles
+import Interface.metrics as metrics
+from Interface.route_cache import RouteCache
+from Interface.csr_graph import CSRGraph
+from Interface.distance_field import HospitalDistanceField
+from Interface.network_voronoi import NetworkVoronoi
+from Interface.graph_updates import GraphUpdates
+from Route_Planning.search_budget import SearchBudget
+import numpy as np
 import pyproj
+import shapely
+from shapely.geometry import LineString, mapping
 
-app = FastAPI()
+# Number of worker processes for route computation, 0 runs it in the request threadpool
+ROUTE_WORKERS = int(os.environ.get("ROUTE_WORKERS", "0"))
+route_pool = None
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if route_pool is not None:
+        route_pool.shutdown(cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Budget of every search started by a request: seconds, and optionally a maximum of
+# nodes popped. Both are checked every few thousand iterations, not on every node
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", "10"))
+SEARCH_MAX_EXPANSIONS = int(os.environ.get("SEARCH_MAX_EXPANSIONS", "0")) or None
+# How often (seconds) a running search checks whether its client is still connected
+DISCONNECT_POLL = 0.25
+
+# Requests slower than this (ms) are printed with their stage breakdown, 0 disables the log
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+
+# Prometheus metrics, scraped from /metrics
+registry = metrics.Registry()
+request_seconds = registry.histogram(
+    "emergencias_request_seconds", "Request duration by endpoint", label="endpoint")
+stage_seconds = registry.histogram(
+    "emergencias_stage_seconds", "Duration of each request stage (snap, hospital, ruta, geojson...)", label="stage")
+search_expanded = registry.histogram(
+    "emergencias_search_expanded_nodes", "Nodes reached by the route search", metrics.COUNT_BUCKETS, label="method")
+route_size = registry.histogram(
+    "emergencias_route_nodes", "Nodes in the returned route", metrics.COUNT_BUCKETS)
+budget_exhausted = registry.counter(
+    "emergencias_search_budget_exhausted_total", "Searches stopped by their budget", label="reason")
+slow_requests = registry.counter(
+    "emergencias_slow_requests_total", "Requests slower than SLOW_REQUEST_MS", label="endpoint")
+
+@app.middleware("http")
+async def stage_timing(request, call_next):
+    # Endpoints put their stage times in request.state.timings. All stages go to the
+    # metrics and to the Server-Timing header (visible in the browser dev tools)
+    request.state.timings = {}
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - t0
+    # The route template, not the raw path, keeps the label set small
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", "otro")
+    request_seconds.observe(total, endpoint)
+
+    timings = request.state.timings
+    if timings:
+        for stage, seconds in timings.items():
+            stage_seconds.observe(seconds, stage)
+        response.headers["Server-Timing"] = ", ".join(f"{stage};dur={s * 1000:.2f}" for stage, s in timings.items())
+
+    if SLOW_REQUEST_MS and total * 1000 >= SLOW_REQUEST_MS:
+        slow_requests.inc(endpoint)
+        stages = " ".join(f"{stage}={s * 1000:.1f}ms" for stage, s in timings.items())
+        url = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        print(f"Petición lenta: {url} {total * 1000:.1f} ms {stages}")
+    return response
+
+@contextmanager
+def timed_stage(request, name):
+    """Times a block as one stage of the request: `with timed_stage(request, 'geojson'): ...`"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = request.state.timings
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+
 # --- Initial loading ---
 print("Cargando grafo y hospitales...")
 
-G = engine.bring_map_data("Zapopan, Jalisco, Mexico")
-G, hosp_coords, hosp_nodes, _ = engine.search_closests_hospitals(G, "Zapopan, Jalisco, Mexico")
+# Loaded from the on-disk snapshot, rebuild it with: python -m Interface.snapshot --refresh
+G, hosp_coords, hosp_nodes = snapshot.load_or_build(snapshot.DEFAULT_PLACE, snapshot.DEFAULT_PATH)
+
+# Snapshots saved before travel times existed get them here
+speed_profiles.ensure_travel_times(G)
+
+# Compact array copy of the graph used for routing and snapping.
+# Every weight profile is one more per-edge array on the same CSR structure
+G_csr = CSRGraph.from_networkx(G, profiles=speed_profiles.weight_functions())
+
+def street_geometries(G, profiles):
+    """
+    {weight: {(u, v): LineString}} for geometria=true. Only curved edges carry one, the rest are
+    straight lines between their nodes. Parallel edges keep, for every weight profile, the copy
+    with the lowest cost under that profile, the same one the CSR routes on. A fast but longer
+    parallel edge is drawn with its own polyline under 'time' and the shorter one under 'length'.
+    """
+    costs = {'length': lambda data: data.get('length', 1), **profiles}
+    cheapest = {weight: {} for weight in costs}
+    for u, v, data in G.edges(data=True):
+        geom = data.get('geometry')
+        for weight, cost_of in costs.items():
+            cost = cost_of(data)
+            best = cheapest[weight].get((u, v))
+            if best is None or cost < best[0]:
+                cheapest[weight][(u, v)] = (cost, geom)
+    return {weight: {edge: geom for edge, (_, geom) in edges.items() if geom is not None}
+            for weight, edges in cheapest.items()}
+
+edge_geometries = street_geometries(G, speed_profiles.weight_functions())
+
+# Everything else is served from the CSR copy, the networkx dictionaries are not kept
+del G
+
+# Nearest hospital by road for every node and weight profile, one multi-source Dijkstra each at startup
+hosp_fields = {weight: HospitalDistanceField(G_csr, hosp_nodes, weight=weight) for weight in G_csr.weights}
+
+# Network Voronoi partition (node -> hospital label array), the authoritative hospital assignment.
+# It shares the `nearest` array of each field, no extra search
+hosp_partitions = {weight: NetworkVoronoi.from_field(field) for weight, field in hosp_fields.items()}
+
+# Euclidean hospital index, built once and kept for the lifetime of the server
+hosp_index = engine.HospitalIndex(hosp_coords, hosp_nodes)
+
+# Street node index for snapping clicks, built once instead of on every nearest_nodes call
+node_index = engine.NodeIndex(G_csr)
+
+# Road closures and cost changes made through the admin API, applied in place
+graph_updates = GraphUpdates(G_csr, hosp_fields)
+
+# Token for the /admin/ endpoints, sent in the X-Admin-Token header; without it they always answer 403
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Optional Contraction Hierarchy, preprocess it with: python -m Interface.snapshot --ch
+ch = snapshot.load_ch(snapshot.DEFAULT_PATH)
+if ch is not None:
+    print("Contraction Hierarchy cargada")
+
+# Optional free slots per hospital, full hospitals are left out of the alternatives
+hosp_capacity = snapshot.load_capacity(snapshot.DEFAULT_PATH)
+
+# Workers are forked after the graph is loaded, so they share it copy-on-write
+workers.set_state(G_csr, hosp_coords, hosp_nodes, fields=hosp_fields, hospital_index=hosp_index, ch=ch,
+                  capacity=hosp_capacity, updates=graph_updates)
+if ROUTE_WORKERS > 0:
+    print(f"Iniciando {ROUTE_WORKERS} procesos de ruteo...")
+    route_pool = workers.create_pool(ROUTE_WORKERS, snapshot.DEFAULT_PATH)
+
+# Clicks cluster on the same intersections, so finished routes are kept in an LRU cache
+ttl = os.environ.get("ROUTE_CACHE_TTL")
+route_cache = RouteCache(
+    maxsize=int(os.environ.get("ROUTE_CACHE_SIZE", "10000")),
+    ttl=float(ttl) if ttl else None,
+)
+
+# GeoJSON of the partition regions per weight, built on first request
+region_cache = RouteCache(maxsize=len(G_csr.weights))
+
+# Isochrone polygons per (hospital node, weight, minutes), built on first request.
+# Minutes are whole numbers up to this limit, so requests cannot fill the cache with new thresholds
+ISOCHRONE_MAX_MINUTES = int(os.environ.get("ISOCHRONE_MAX_MINUTES", "30"))
+isochrone_cache = RouteCache(maxsize=int(os.environ.get("ISOCHRONE_CACHE_SIZE", "2000")))
+
+# The caches already count their hits and misses, /metrics reads them at scrape time
+caches = {"rutas": route_cache, "regiones": region_cache, "isocronas": isochrone_cache}
+for counter in ("hits", "misses", "evictions"):
+    registry.callback(f"emergencias_cache_{counter}_total", f"Cache {counter}",
+                      lambda counter=counter: {name: cache.stats()[counter] for name, cache in caches.items()},
+                      kind="counter", label="cache")
+registry.callback("emergencias_cache_entries", "Entries in each cache",
+                  lambda: {name: cache.stats()['entries'] for name, cache in caches.items()}, label="cache")
+registry.callback("emergencias_street_changes", "Edges whose cost differs from the snapshot",
+                  lambda: {None: len(graph_updates.changes())})
 
 # We prepare coordinate translator
-project_to_meters = pyproj.Transformer.from_crs("EPSG:4326", G.graph['crs'], always_xy=True).transform
-project_to_latlon = pyproj.Transformer.from_crs(G.graph['crs'], "EPSG:4326", always_xy=True).transform
+project_to_meters = pyproj.Transformer.from_crs("EPSG:4326", G_csr.crs, always_xy=True).transform
+project_to_latlon = pyproj.Transformer.from_crs(G_csr.crs, "EPSG:4326", always_xy=True).transform
+
+class Punto(BaseModel):
+    lat: float
+    lon: float
+
+class CambioCalle(BaseModel):
+    u: int
+    v: int
+    ambos_sentidos: bool = False
+    peso: Optional[str] = None
+    valor: Optional[float] = None
+
+class LotePuntos(BaseModel):
+    puntos: List[Punto]
+    geometria: bool = False
+    peso: str = 'length'
+
+def snap(request, xs, ys):
+    """OSM ids of the nodes closest to projected points, timed as the request's 'snap' stage."""
+    with timed_stage(request, "snap"):
+        return node_index.nearest_batch(xs, ys)
+
+def resolve_peso(peso):
+    """Weight profile for the request, or None if it does not exist. 'time:auto' follows the clock."""
+    weight = speed_profiles.resolve_weight(peso)
+    return weight if weight in G_csr.weights else None
+
+def peso_error(peso):
+    return {"error": f"Peso desconocido: {peso}. Opciones: {', '.join(list(G_csr.weights) + ['time:auto'])}"}
+
+def edge_geometry_xy(route, weight='length'):
+    """
+    Projected x, y arrays following the real street polylines of a route found with `weight`.
+    Edges without a 'geometry' attribute are straight lines between their nodes.
+    """
+    geometries = edge_geometries[weight]
+    geoms = []
+    for u, v in zip(route[:-1], route[1:]):
+        geom = geometries.get((u, v))
+        if geom is None:
+            geom = LineString([G_csr.coords(u), G_csr.coords(v)])
+        geoms.append(geom)
+
+    if not geoms:
+        return G_csr.coords_of(route)
+
+    coords = shapely.get_coordinates(geoms)
+    # Consecutive edges share their joint node, drop the repeated point
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+    coords = coords[keep]
+    return coords[:, 0], coords[:, 1]
+
+def paths_to_latlon(paths, geometria=False, weight='length'):
+    """
+    Convert many routes (lists of OSM ids) to [lon, lat] lists with a single pyproj call.
+    With `geometria` the polylines are those of the parallel edges chosen under `weight`.
+    """
+    if geometria:
+        parts = [edge_geometry_xy(p, weight) if p else (np.empty(0), np.empty(0)) for p in paths]
+        sizes = [len(x) for x, _ in parts]
+        if not sum(sizes):
+            return [[] for _ in paths]
+        xs = np.concatenate([x for x, _ in parts])
+        ys = np.concatenate([y for _, y in parts])
+    else:
+        sizes = [len(p) for p in paths]
+        if not sum(sizes):
+            return [[] for _ in paths]
+        xs, ys = G_csr.coords_of(n for p in paths for n in p)
+
+    lons, lats = project_to_latlon(xs, ys)
+    coords = np.column_stack((lons, lats)).tolist()
+
+    result = []
+    start = 0
+    for size in sizes:
+        result.append(coords[start:start + size])
+        start += size
+    return result
+
+async def run_routing(func, *args):
+    # CPU-bound search goes to the process pool (or threadpool), the event loop only awaits it
+    if route_pool is not None:
+        # Workers replay the admin edge changes they have not seen yet before running
+        changes = graph_updates.changes()
+        return await asyncio.wrap_future(route_pool.submit(workers.run_synced, changes, func, *args))
+    return await run_in_threadpool(func, *args)
+
+# Why a search stopped early, as shown to the client
+BUDGET_ERRORS = {
+    'tiempo': "Búsqueda detenida: se agotó el tiempo",
+    'expansiones': "Búsqueda detenida: se alcanzó el máximo de nodos",
+    'cancelada': "Búsqueda cancelada",
+}
+
+async def run_search(request, func, *args):
+    """
+    run_routing for the worker functions that take a `budget`. The SearchBudget carries
+    the request deadline and a cancel token that fires when the client disconnects, so
+    abandoned requests stop their search. Returns (result, reason the budget ran out or None).
+    """
+    token = workers.acquire_cancel_token()
+    budget = SearchBudget(max_expansions=SEARCH_MAX_EXPANSIONS, timeout=SEARCH_TIMEOUT, cancel=token)
+    task = asyncio.ensure_future(run_routing(workers.run_budgeted, func, budget, *args))
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=DISCONNECT_POLL)
+            if not task.done() and not token.is_cancelled() and await request.is_disconnected():
+                token.cancel()
+        result, reason = task.result()
+    finally:
+        if task.done():
+            workers.release_cancel_token(token)
+        else:
+            # The request itself was cancelled: stop the search and free the slot once it returns
+            token.cancel()
+            task.add_done_callback(lambda _: workers.release_cancel_token(token))
+    if reason is not None:
+        budget_exhausted.inc(reason)
+    return result, reason
+
+@app.get("/salud/")
+async def salud():
+    return {
+        "estado": "ok",
+        "nodos": G_csr.number_of_nodes(),
+        "memoria_grafo_mb": round(G_csr.nbytes() / 1e6, 1),
+        "procesos": ROUTE_WORKERS,
+        "pesos": list(G_csr.weights),
+        "cambios_calles": len(graph_updates.changes()),
+        "cache": route_cache.stats(),
+        "cache_isocronas": isochrone_cache.stats(),
+        "latencia_ms": {name: round(mean * 1000, 3) for name, mean in stage_seconds.means().items()},
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text format: request and stage latencies, search work, cache counters."""
+    return PlainTextResponse(registry.render(), media_type=metrics.Registry.CONTENT_TYPE)
 
 @app.get("/calcular-ruta/")
-def calcular_ruta(lat: float, lon: float):
-    print(f"Recibido clic en: {lat}, {lon}")
+async def calcular_ruta(request: Request, lat: float, lon: float, geometria: bool = False, peso: str = 'length'):
+    weight = resolve_peso(peso)
+    if weight is None:
+        return peso_error(peso)
     
     # Translate click (degrees) to map (meters) 
-    x_meters, y_meters = project_to_meters(lon, lat)
+    with timed_stage(request, "proyeccion"):
+        x_meters, y_meters = project_to_meters(lon, lat)
     
     # Find the closest node to the click
-    origin_node = ox.distance.nearest_nodes(G, x_meters, y_meters)
-    
-    # Run passing the exact node
-    route_nodes, hospital_node = engine.emergency_routing_system(
-        G, hosp_coords, hosp_nodes, origin_node=origin_node
-    )
+    origin_node = int(snap(request, x_meters, y_meters)[0])
     
-    if not route_nodes:
+    # The assigned hospital is an O(1) lookup, which gives us the cache key
+    with timed_stage(request, "hospital"):
+        # Each profile has its own partition and its own cache entries
+        idx_hospital = hosp_partitions[weight].hospital_of(origin_node)
+    if idx_hospital is None:
         return {"error": "No se encontró ruta"}
+    key = (int(origin_node), int(hosp_nodes[idx_hospital]), weight)
+
+    entry = route_cache.get(key)
+    if entry is not None and geometria in entry['geojson']:
+        return entry['geojson'][geometria]
+
+    if entry is None:
+        # Run passing the exact node
+        with timed_stage(request, "ruta"):
+            (route_nodes, hospital_node, stats), reason = await run_search(
+                request, workers.compute_route, origin_node, weight)
+        # Stages measured inside the engine (in the worker process when there is a pool);
+        # 'ruta' keeps only what they do not cover: dispatch, pickling and waiting for a worker
+        engine_stages = stats.get('stages', {})
+        timings = request.state.timings
+        timings["ruta"] = max(timings["ruta"] - sum(engine_stages.values()), 0.0)
+        timings.update(engine_stages)
+        if 'expanded' in stats:
+            search_expanded.observe(stats['expanded'], stats.get('method'))
+        if not route_nodes:
+            return {"error": BUDGET_ERRORS.get(reason, "No se encontró ruta")}
+        route_size.observe(len(route_nodes))
+        entry = route_cache.put(key, route_nodes)
+
+    # Translate resulting path (meters -> degrees) in one array call.
+    # With geometria=true we follow the street polylines instead of node-to-node lines.
+    # GeoJSON waits for [lon, lat]
+    with timed_stage(request, "geojson"):
+        path_latlon = paths_to_latlon([entry['route']], geometria=geometria, weight=weight)[0]
+
+        # GeoJSON real answer
+        response = {
+            "ruta": {
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": path_latlon
+                },
+                "properties": {"color": "blue"}
+            }
+        }
+    entry['geojson'][geometria] = response
+    return response
+
+@app.get("/ruta-punto-a-punto/")
+async def ruta_punto_a_punto(request: Request, lat_origen: float, lon_origen: float, lat_destino: float, lon_destino: float,
+                             geometria: bool = False, peso: str = 'length'):
+    """Route between two arbitrary points, answered by the CH when one is loaded."""
+    weight = resolve_peso(peso)
+    if weight is None:
+        return peso_error(peso)
+    xs, ys = project_to_meters(np.array([lon_origen, lon_destino]), np.array([lat_origen, lat_destino]))
+    origin_node, target_node = snap(request, xs, ys).tolist()
+
+    route_nodes, reason = await run_search(request, workers.compute_point_to_point, origin_node, target_node, weight)
+    if not route_nodes:
+        return {"error": BUDGET_ERRORS.get(reason, "No se encontró ruta")}
 
-    # Translate resulting path (meters -> degrees) 
-    # Extract coordinates (x,y) of each node in the route
-    path_coords_meters = [(G.nodes[n]['x'], G.nodes[n]['y']) for n in route_nodes]
-    
-    # Convert each point to Lat/Lon
-    path_latlon = []
-    for x, y in path_coords_meters:
-        lon_geo, lat_geo = project_to_latlon(x, y)
-        # Leaflet/GeoJSON waits for [lon, lat] or [lat, lon]. 
-        path_latlon.append([lon_geo, lat_geo])
-
-    # GeoJSON real answer
     return {
         "ruta": {
             "type": "Feature",
             "geometry": {
                 "type": "LineString",
-                "coordinates": path_latlon
+                "coordinates": paths_to_latlon([route_nodes], geometria=geometria, weight=weight)[0]
             },
             "properties": {"color": "blue"}
         }
-    }
\ No newline at end of file
+    }
+
+@app.get("/traza-busqueda/")
+async def traza_busqueda(request: Request, lat_origen: float, lon_origen: float, lat_destino: float, lon_destino: float,
+                         algoritmo: str = 'a_star', max_puntos: int = 5000):
+    """
+    Expansion order of one search between two points, so the frontend can animate how the
+    frontier grows. Long traces are sampled down to about `max_puntos` points, in order.
+    """
+    if algoritmo not in workers.TRACEABLE_SEARCHES:
+        return {"error": f"Algoritmo desconocido: {algoritmo}. Opciones: {', '.join(workers.TRACEABLE_SEARCHES)}"}
+    xs, ys = project_to_meters(np.array([lon_origen, lon_destino]), np.array([lat_origen, lat_destino]))
+    origin_node, target_node = snap(request, xs, ys).tolist()
+
+    (route_nodes, trace, stats), reason = await run_search(
+        request, workers.compute_search_trace, origin_node, target_node, algoritmo)
+    step = max(1, -(-len(trace) // max(1, max_puntos)))
+    route_latlon, trace_latlon = paths_to_latlon([route_nodes or [], trace[::step]])
+
+    return {
+        "ruta": {
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": route_latlon} if route_nodes else None,
+            "properties": {"color": "blue"}
+        },
+        "expansiones": {
+            "type": "Feature",
+            "geometry": {"type": "MultiPoint", "coordinates": trace_latlon},
+            "properties": {"paso": step, "total": len(trace)}
+        },
+        "estadisticas": stats,
+        "presupuesto": reason,
+    }
+
+@app.get("/hospitales-cercanos/")
+async def hospitales_cercanos(request: Request, lat: float, lon: float, k: int = 3, geometria: bool = False, peso: str = 'length'):
+    """
+    The `k` best hospitals for a click with the route to each one, ranked by network cost,
+    so the dispatcher has alternatives when the first hospital cannot take the patient.
+    """
+    weight = resolve_peso(peso)
+    if weight is None:
+        return peso_error(peso)
+    if k < 1:
+        return {"error": "k debe ser al menos 1"}
+
+    x_meters, y_meters = project_to_meters(lon, lat)
+    origin_node = int(snap(request, x_meters, y_meters)[0])
+
+    # A single Dijkstra from the click that stops once the k best hospitals are settled
+    ranking, reason = await run_search(request, workers.compute_k_nearest, origin_node, k, weight)
+    if not ranking:
+        return {"error": BUDGET_ERRORS.get(reason, "No se encontró ruta")}
+
+    paths_latlon = paths_to_latlon([route for _, route, _, _ in ranking], geometria=geometria, weight=weight)
+    cost_field = "distancia_m" if weight == 'length' else "tiempo_s"
+    features = []
+    for rank, ((h, _, cost, _), coords) in enumerate(zip(ranking, paths_latlon), 1):
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": coords
+            },
+            "properties": {
+                "rango": rank,
+                "color": "blue" if rank == 1 else "gray",
+                "hospital": int(hosp_nodes[h]),
+                "peso": weight,
+                cost_field: round(cost, 1)
+            }
+        })
+
+    return {"type": "FeatureCollection", "features": features}
+
+@app.post("/calcular-rutas/")
+async def calcular_rutas(request: Request, lote: LotePuntos):
+    """Route many emergencies in one request, answers with a GeoJSON FeatureCollection."""
+    weight = resolve_peso(lote.peso)
+    if weight is None:
+        return peso_error(lote.peso)
+    if not lote.puntos:
+        return {"type": "FeatureCollection", "features": []}
+
+    lats = np.array([p.lat for p in lote.puntos])
+    lons = np.array([p.lon for p in lote.puntos])
+
+    # Projection and snapping run once over the whole array
+    xs, ys = project_to_meters(lons, lats)
+    origin_nodes = snap(request, xs, ys)
+
+    # Hospital assignment and routes come from the precomputed distance field
+    # split in one chunk per worker so the pointer walks run in parallel
+    origin_nodes = origin_nodes.tolist()
+    n_chunks = max(1, ROUTE_WORKERS)
+    size = -(-len(origin_nodes) // n_chunks)
+    chunks = [origin_nodes[i:i + size] for i in range(0, len(origin_nodes), size)]
+    partial = await asyncio.gather(*(run_routing(workers.compute_route_batch, c, weight) for c in chunks))
+    results = [r for part in partial for r in part]
+    paths_latlon = paths_to_latlon([route or [] for route, _, _ in results], geometria=lote.geometria,
+                                  weight=weight)
+
+    # Costs are meters for 'length' and seconds for the time profiles
+    cost_field = "distancia_m" if weight == 'length' else "tiempo_s"
+    features = []
+    for i, ((route, hospital_node, dist), coords) in enumerate(zip(results, paths_latlon)):
+        if route is None:
+            features.append({
+                "type": "Feature",
+                "geometry": None,
+                "properties": {"indice": i, "error": "No se encontró ruta"}
+            })
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": coords
+            },
+            "properties": {
+                "indice": i,
+                "color": "blue",
+                "hospital": hospital_node,
+                "peso": weight,
+                cost_field: round(dist, 1)
+            }
+        })
+
+    return {"type": "FeatureCollection", "features": features}
+
+@app.get("/regiones/")
+async def regiones(peso: str = 'length'):
+    """
+    Network Voronoi regions as a GeoJSON FeatureCollection, one (Multi)Polygon per hospital
+    covering the streets it reaches first by road. The same partition assigns hospitals in /calcular-ruta/.
+    """
+    weight = resolve_peso(peso)
+    if weight is None:
+        return peso_error(peso)
+
+    entry = region_cache.get(weight)
+    if entry is None:
+        regions = await run_in_threadpool(hosp_partitions[weight].region_polygons)
+        features = []
+        for h, polygon in sorted(regions.items()):
+            geometry = shapely.transform(polygon, lambda c: np.column_stack(project_to_latlon(c[:, 0], c[:, 1])))
+            features.append({
+                "type": "Feature",
+                "geometry": mapping(geometry),
+                "properties": {
+                    "hospital": int(hosp_nodes[h]),
+                    "nodos": int(np.count_nonzero(hosp_partitions[weight].labels == h)),
+                    "peso": weight,
+                },
+            })
+        entry = region_cache.put(weight, regions, geojson={'feature': {"type": "FeatureCollection", "features": features}})
+
+    return entry['geojson']['feature']
+
+@app.get("/isocrona/")
+async def isocrona(minutos: int = Query(gt=0, le=ISOCHRONE_MAX_MINUTES), hospital: Optional[int] = None,
+                   peso: str = 'time'):
+    """
+    Area each hospital reaches within `minutos` (whole minutes, 1 to ISOCHRONE_MAX_MINUTES),
+    as a GeoJSON FeatureCollection with one polygon per hospital (only `hospital`, an OSM
+    node id, when it is given).
+    """
+    weight = resolve_peso(peso)
+    if weight is None:
+        return peso_error(peso)
+    if not weight.startswith('time'):
+        return {"error": "La isócrona necesita un peso de tiempo (time, time:hora_pico, ...)"}
+
+    nodes = sorted(set(int(n) for n in hosp_nodes))
+    if hospital is not None:
+        if hospital not in nodes:
+            return {"error": f"No hay hospital en el nodo {hospital}"}
+        nodes = [hospital]
+
+    entries = {node: isochrone_cache.get((node, weight, minutos)) for node in nodes}
+    missing = [node for node, entry in entries.items() if entry is None]
+    if missing:
+        # Truncated Dijkstra per hospital, split across the workers like the batch routes
+        n_chunks = max(1, ROUTE_WORKERS)
+        size = -(-len(missing) // n_chunks)
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+        partial = await asyncio.gather(
+            *(run_routing(workers.compute_isochrones, c, minutos * 60, weight) for c in chunks)
+        )
+        polygons = [p for part in partial for p in part]
+        for node, polygon in zip(missing, polygons):
+            geometry = shapely.transform(polygon, lambda c: np.column_stack(project_to_latlon(c[:, 0], c[:, 1])))
+            feature = {
+                "type": "Feature",
+                "geometry": mapping(geometry),
+                "properties": {"hospital": node, "minutos": minutos, "peso": weight},
+            }
+            entries[node] = isochrone_cache.put((node, weight, minutos), polygon, geojson={'feature': feature})
+
+    return {"type": "FeatureCollection", "features": [entries[node]['geojson']['feature'] for node in nodes]}
+
+def check_admin(token):
+    if not ADMIN_TOKEN or token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+def street_edges(cambio):
+    """(u, v) pairs the change applies to, the reverse direction only if that edge exists."""
+    edges = [(cambio.u, cambio.v)]
+    if cambio.ambos_sentidos and cambio.v in G_csr and cambio.u in G_csr and G_csr.edge_position(cambio.v, cambio.u) is not None:
+        edges.append((cambio.v, cambio.u))
+    return edges
+
+def invalidate_changed(changed):
+    """
+    Drop only the cached results the edited edges can affect. A cached route is still
+    optimal unless the repair touched its origin node.
+    """
+    for weight, nodes in changed.items():
+        # Any cost change can move the border of an isochrone of that weight
+        isochrone_cache.invalidate(lambda key: key[1] == weight)
+        if len(nodes):
+            changed_ids = set(G_csr.node_ids[nodes].tolist())
+            route_cache.invalidate(lambda key: key[2] == weight and key[0] in changed_ids)
+            region_cache.invalidate(lambda key: key == weight)
+
+def apply_street_change(cambio, action):
+    t0 = time.perf_counter()
+    summary = {}
+    try:
+        for u, v in street_edges(cambio):
+            changed = action(u, v)
+            invalidate_changed(changed)
+            for weight, nodes in changed.items():
+                summary[weight] = summary.get(weight, 0) + len(nodes)
+    except KeyError:
+        return {"error": f"No existe la calle {cambio.u} -> {cambio.v}"}
+    return {
+        "aristas": [list(e) for e in street_edges(cambio)],
+        "nodos_reparados": summary,
+        "cambios_activos": len(graph_updates.changes()),
+        "tiempo_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+@app.post("/admin/cerrar-calle/")
+async def cerrar_calle(cambio: CambioCalle, x_admin_token: Optional[str] = Header(None)):
+    """Close a street (edge u -> v, and v -> u with ambos_sentidos) for every weight profile."""
+    check_admin(x_admin_token)
+    return apply_street_change(cambio, graph_updates.close_edge)
+
+@app.post("/admin/abrir-calle/")
+async def abrir_calle(cambio: CambioCalle, x_admin_token: Optional[str] = Header(None)):
+    """Undo closures and cost changes of a street (only for `peso` when it is given)."""
+    check_admin(x_admin_token)
+    weight = resolve_peso(cambio.peso) if cambio.peso else None
+    if cambio.peso and weight is None:
+        return peso_error(cambio.peso)
+    return apply_street_change(cambio, lambda u, v: graph_updates.restore(u, v, weight))
+
+@app.post("/admin/peso-calle/")
+async def peso_calle(cambio: CambioCalle, x_admin_token: Optional[str] = Header(None)):
+    """Set the cost of a street for one weight profile, e.g. a slower time for a partial blockage."""
+    check_admin(x_admin_token)
+    weight = resolve_peso(cambio.peso or 'length')
+    if weight is None:
+        return peso_error(cambio.peso)
+    if cambio.valor is None or cambio.valor < 0:
+        return {"error": "valor debe ser un número mayor o igual a cero"}
+    return apply_street_change(cambio, lambda u, v: {weight: graph_updates.set_weight(u, v, weight, cambio.valor)})
+
+@app.get("/admin/cambios/")
+async def cambios(x_admin_token: Optional[str] = Header(None)):
+    """Edges that currently differ from the loaded snapshot."""
+    check_admin(x_admin_token)
+    return {
+        "cambios": [
+            {"u": u, "v": v, "peso": weight, "original": graph_updates.original[(u, v, weight)],
+             "valor": value if np.isfinite(value) else None}
+            for (u, v, weight), value in graph_updates.changes().items()
+        ]
+    }
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+import Interface.route_emergency as engine
+import Interface.synthetic_city as synthetic_city
+from Route_Planning.contraction_hierarchies import ContractionHierarchy
+
+# Bump this whenever the on-disk layout or the contents of the snapshot change,
+# old snapshots are then rejected instead of being loaded half-compatible.
+SNAPSHOT_VERSION = 1
+
+DEFAULT_PLACE = "Zapopan, Jalisco, Mexico"
+DEFAULT_PATH = os.environ.get(
+    "ROUTE_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "zapopan_snapshot"),
+)
+
+MANIFEST_FILE = "manifest.json"
+GRAPH_FILE = "graph.pkl"
+HOSP_COORDS_FILE = "hospitals_coords.npy"
+HOSP_NODES_FILE = "hospitals_nodes.npy"
+CH_FILE = "ch.npz"
+# Optional, free slots per hospital in the same order as HOSP_NODES_FILE
+HOSP_CAPACITY_FILE = "hospitals_capacity.npy"
+
+
+def snapshot_exists(path=DEFAULT_PATH):
+    # The manifest is written last, so its presence means the snapshot is complete
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def save_snapshot(path, G, hosp_coords, hosp_nodes, place=DEFAULT_PLACE):
+    """Write the projected graph and the hospital coordinates/nodes to `path`."""
+    os.makedirs(path, exist_ok=True)
+
+    # Remove the old manifest first so a crash mid-write leaves no valid snapshot
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    with open(os.path.join(path, GRAPH_FILE), "wb") as f:
+        pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    np.save(os.path.join(path, HOSP_COORDS_FILE), np.asarray(hosp_coords, dtype=np.float64).reshape(-1, 2))
+    np.save(os.path.join(path, HOSP_NODES_FILE), np.asarray(hosp_nodes, dtype=np.int64))
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "place": place,
+        "crs": str(G.graph.get("crs")),
+        "nodes": G.number_of_nodes(),
+        "edges": G.number_of_edges(),
+        "hospitals": int(len(hosp_nodes)),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(path=DEFAULT_PATH):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_snapshot(path=DEFAULT_PATH):
+    """
+    Bulk-load a snapshot written by `save_snapshot`.
+    Returns (G, hosp_coords, hosp_nodes). The hospital arrays are memory-mapped.
+    """
+    if not snapshot_exists(path):
+        raise FileNotFoundError(f"No snapshot found at {path}. Build it with: python -m Interface.snapshot --refresh")
+
+    manifest = read_manifest(path)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise RuntimeError(
+            f"Snapshot at {path} has version {manifest.get('version')}, expected {SNAPSHOT_VERSION}. "
+            "Rebuild it with: python -m Interface.snapshot --refresh"
+        )
+
+    with open(os.path.join(path, GRAPH_FILE), "rb") as f:
+        G = pickle.load(f)
+
+    hosp_coords = np.load(os.path.join(path, HOSP_COORDS_FILE), mmap_mode="r")
+    hosp_nodes = np.load(os.path.join(path, HOSP_NODES_FILE), mmap_mode="r")
+
+    return G, hosp_coords, hosp_nodes
+
+
+def load_capacity(path=DEFAULT_PATH):
+    """Per-hospital capacity stored next to the snapshot, or None if there is none."""
+    capacity_path = os.path.join(path, HOSP_CAPACITY_FILE)
+    if not os.path.isfile(capacity_path):
+        return None
+    return np.load(capacity_path)
+
+
+def load_ch(path=DEFAULT_PATH):
+    """Contraction Hierarchy stored next to the snapshot, or None if it was never built."""
+    ch_path = os.path.join(path, CH_FILE)
+    if not os.path.isfile(ch_path):
+        return None
+    return ContractionHierarchy.load(ch_path)
+
+
+def build_ch(path=DEFAULT_PATH):
+    """Preprocess the snapshot's graph into a Contraction Hierarchy and store it."""
+    G, _, _ = load_snapshot(path)
+    ch = ContractionHierarchy.build(G, verbose=True)
+    ch.save(os.path.join(path, CH_FILE))
+    return ch
+
+
+def build_snapshot(place=DEFAULT_PLACE, path=DEFAULT_PATH):
+    """Download the map and hospitals from OSM and store them as a new snapshot."""
+    G = engine.bring_map_data(place)
+    G, hosp_coords, hosp_nodes, _ = engine.search_closests_hospitals(G, place)
+    save_snapshot(path, G, hosp_coords, hosp_nodes, place=place)
+    # A CH from the previous graph would give wrong routes on the new one
+    ch_path = os.path.join(path, CH_FILE)
+    if os.path.exists(ch_path):
+        os.remove(ch_path)
+    return G, np.asarray(hosp_coords), np.asarray(hosp_nodes)
+
+
+def build_synthetic_snapshot(kind, n_nodes, n_hospitals, seed=0, path=DEFAULT_PATH):
+    """Generate a synthetic city (see synthetic_city.generate_city) and store it as a snapshot."""
+    city = synthetic_city.generate_city(kind, n_nodes, seed=seed)
+    hosp_coords, hosp_nodes = city.place_hospitals(n_hospitals, seed=seed)
+    G = city.to_networkx()
+    save_snapshot(path, G, hosp_coords, hosp_nodes, place=f"synthetic:{kind}:{n_nodes}:{seed}")
+    ch_path = os.path.join(path, CH_FILE)
+    if os.path.exists(ch_path):
+        os.remove(ch_path)
+    return G, hosp_coords, hosp_nodes
+
+
+def load_or_build(place=DEFAULT_PLACE, path=DEFAULT_PATH):
+    # Only the very first boot needs network access, after that we always load from disk
+    if snapshot_exists(path):
+        return load_snapshot(path)
+    print(f"No snapshot at {path}, building it from OSM (only happens once)...")
+    return build_snapshot(place, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the offline graph snapshot used by the server.")
+    parser.add_argument("--refresh", action="store_true", help="Download OSM data again and overwrite the snapshot")
+    parser.add_argument("--ch", action="store_true", help="Preprocess a Contraction Hierarchy for the snapshot")
+    parser.add_argument("--place", default=DEFAULT_PLACE)
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--synthetic", choices=synthetic_city.KINDS,
+                        help="Generate a synthetic city of this kind instead of downloading OSM data")
+    parser.add_argument("--nodes", type=int, default=100000, help="Approximate intersections of the synthetic city")
+    parser.add_argument("--hospitals", type=int, default=40, help="Hospitals placed in the synthetic city")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.refresh and not args.ch and not args.synthetic:
+        if snapshot_exists(args.path):
+            print(json.dumps(read_manifest(args.path), indent=2))
+        else:
+            print(f"No snapshot at {args.path}. Run with --refresh to build it.")
+
+    if args.synthetic:
+        t0 = time.perf_counter()
+        build_synthetic_snapshot(args.synthetic, args.nodes, args.hospitals, seed=args.seed, path=args.path)
+        print(f"Synthetic snapshot written to {args.path} in {time.perf_counter() - t0:.1f} s")
+    elif args.refresh:
+        t0 = time.perf_counter()
+        build_snapshot(args.place, args.path)
+        print(f"Snapshot written to {args.path} in {time.perf_counter() - t0:.1f} s")
+
+    if args.ch:
+        t0 = time.perf_counter()
+        build_ch(args.path)
+        print(f"Contraction Hierarchy written to {args.path} in {time.perf_counter() - t0:.1f} s")
@@ -0,0 +1,102 @@
+import time
+import osmnx as ox
+
+# Default speeds (km/h) by road class, used when an edge has no usable 'maxspeed'
+HIGHWAY_SPEEDS = {
+    'motorway': 90,
+    'motorway_link': 50,
+    'trunk': 70,
+    'trunk_link': 40,
+    'primary': 50,
+    'primary_link': 35,
+    'secondary': 40,
+    'secondary_link': 30,
+    'tertiary': 35,
+    'tertiary_link': 25,
+    'residential': 25,
+    'living_street': 15,
+    'unclassified': 25,
+    'service': 15,
+}
+FALLBACK_SPEED = 30
+
+# Time-of-day speed multipliers by road class (1.0 = free flow). Each profile becomes
+# its own weight 'time:<name>', 'time' alone is free flow.
+SPEED_PROFILES = {
+    'hora_pico': {
+        'hours': [(7, 10), (18, 21)],
+        'multipliers': {
+            'motorway': 0.6, 'trunk': 0.55, 'primary': 0.5, 'secondary': 0.6,
+            'tertiary': 0.7, 'residential': 0.85,
+        },
+        'default': 0.75,
+    },
+    'noche': {
+        'hours': [(22, 24), (0, 6)],
+        'multipliers': {'residential': 1.0, 'living_street': 1.0, 'service': 1.0},
+        'default': 1.15,
+    },
+}
+
+# Attribute that holds each weight on the networkx graph
+EDGE_ATTRIBUTES = {'length': 'length', 'time': 'travel_time'}
+
+
+def add_travel_times(G):
+    """Attach 'speed_kph' and 'travel_time' (seconds) to every edge from maxspeed and road class."""
+    G = ox.add_edge_speeds(G, hwy_speeds=HIGHWAY_SPEEDS, fallback=FALLBACK_SPEED)
+    G = ox.add_edge_travel_times(G)
+    return G
+
+
+def ensure_travel_times(G):
+    """Add travel times to graphs from older snapshots that were saved without them."""
+    if any('travel_time' not in data for _, _, data in G.edges(data=True)):
+        print("Calculando tiempos de recorrido...")
+        add_travel_times(G)
+    return G
+
+
+def road_class(data):
+    highway = data.get('highway', '')
+    # OSMnx keeps a list when merged ways have different classes
+    if isinstance(highway, list):
+        highway = highway[0] if highway else ''
+    return highway
+
+
+def weight_functions():
+    """
+    {weight name: function(edge data) -> cost} for every profile, to build the
+    per-edge weight arrays of CSRGraph in one pass over the edges.
+    """
+    functions = {
+        'time': lambda data: data.get('travel_time', data.get('length', 1) / (FALLBACK_SPEED / 3.6)),
+    }
+    for name, profile in SPEED_PROFILES.items():
+        functions[f'time:{name}'] = _profile_function(profile, functions['time'])
+    return functions
+
+
+def _profile_function(profile, base):
+    multipliers = profile['multipliers']
+    default = profile['default']
+    # Slower traffic means a multiplier below 1, so the time grows
+    return lambda data: base(data) / multipliers.get(road_class(data), default)
+
+
+def profile_for_hour(hour=None):
+    """Weight name for the given hour (local time now by default), 'time' if no profile applies."""
+    if hour is None:
+        hour = time.localtime().tm_hour
+    for name, profile in SPEED_PROFILES.items():
+        if any(start <= hour < end for start, end in profile['hours']):
+            return f'time:{name}'
+    return 'time'
+
+
+def resolve_weight(weight):
+    """'time:auto' picks the profile of the current hour, anything else is returned unchanged."""
+    if weight == 'time:auto':
+        return profile_for_hour()
+    return weight
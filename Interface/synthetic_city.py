@@ -0,0 +1,294 @@
+import numpy as np
+import networkx as nx
+import pyproj
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import Delaunay, cKDTree
+import Interface.speed_profiles as speed_profiles
+from Interface.csr_graph import CSRGraph
+
+# Synthetic graphs are placed in UTM zone 13N (Guadalajara area), like the projected Zapopan graph
+DEFAULT_CRS = "EPSG:32613"
+DEFAULT_ORIGIN = (660000.0, 2280000.0)
+
+# Road classes, stored as small integer codes while the graph is built
+HIGHWAY_CLASSES = np.array(['primary', 'secondary', 'tertiary', 'residential'])
+PRIMARY, SECONDARY, TERTIARY, RESIDENTIAL = range(4)
+
+KINDS = ('grid', 'radial', 'planar')
+
+
+class SyntheticCity:
+    """
+    Street network generated from a seed, kept as flat arrays so metro-scale graphs
+    (1M+ nodes) fit in memory. `to_networkx` gives a projected OSMnx-style
+    MultiDiGraph for the existing code, `to_csr` skips networkx entirely.
+
+    Directed edge k goes from node u[k] to node v[k]. Node ids are 0..n-1.
+    """
+
+    def __init__(self, name, x, y, u, v, highway, oneway, street, crs=DEFAULT_CRS):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.u = u
+        self.v = v
+        self.highway = highway
+        self.oneway = oneway
+        # Street id of every directed edge, both directions of a two-way street share it (OSMnx 'osmid')
+        self.street = street
+        self.crs = crs
+        self.length = np.hypot(x[u] - x[v], y[u] - y[v])
+
+    def number_of_nodes(self):
+        return len(self.x)
+
+    def number_of_edges(self):
+        return len(self.u)
+
+    def travel_times(self):
+        """Free-flow seconds per edge, with the same road-class speeds as speed_profiles."""
+        speed_kph = np.array([speed_profiles.HIGHWAY_SPEEDS.get(name, speed_profiles.FALLBACK_SPEED)
+                              for name in HIGHWAY_CLASSES], dtype=np.float64)[self.highway]
+        return speed_kph, self.length / (speed_kph / 3.6)
+
+    def to_networkx(self):
+        """Projected MultiDiGraph with the node and edge attributes OSMnx would give."""
+        G = nx.MultiDiGraph(crs=self.crs, name=self.name, synthetic=True)
+        lon, lat = pyproj.Transformer.from_crs(self.crs, "EPSG:4326", always_xy=True).transform(self.x, self.y)
+        street_count = np.bincount(self.street_nodes(), minlength=self.number_of_nodes())
+        G.add_nodes_from(
+            (i, {'x': x, 'y': y, 'lon': lo, 'lat': la, 'street_count': c})
+            for i, (x, y, lo, la, c) in enumerate(zip(self.x.tolist(), self.y.tolist(), lon.tolist(), lat.tolist(),
+                                                     street_count.tolist()))
+        )
+
+        speed_kph, travel_time = self.travel_times()
+        # The second edge of a two-way street is the reversed one
+        first = np.zeros(self.number_of_edges(), dtype=bool)
+        first[np.unique(self.street, return_index=True)[1]] = True
+        G.add_edges_from(
+            (u, v, {'osmid': s, 'highway': HIGHWAY_CLASSES[h], 'oneway': o, 'reversed': not f, 'length': length,
+                    'speed_kph': sp, 'travel_time': t})
+            for u, v, s, h, o, f, length, sp, t in zip(
+                self.u.tolist(), self.v.tolist(), self.street.tolist(), self.highway.tolist(),
+                self.oneway.tolist(), first.tolist(), self.length.tolist(), speed_kph.tolist(), travel_time.tolist(),
+            )
+        )
+        return G
+
+    def street_nodes(self):
+        """Endpoints of every street counted once (both directions share a street id)."""
+        _, first_idx = np.unique(self.street, return_index=True)
+        return np.concatenate((self.u[first_idx], self.v[first_idx]))
+
+    def to_csr(self, profiles=True):
+        """
+        CSRGraph built straight from the arrays. With `profiles` it carries the same
+        weight profiles as the server ('time', 'time:hora_pico', ...).
+        """
+        n = self.number_of_nodes()
+        order = np.lexsort((self.v, self.u))
+        src = self.u[order]
+        targets = self.v[order].astype(np.int32)
+
+        weights = {'length': self.length[order].astype(np.float32)}
+        if profiles:
+            _, travel_time = self.travel_times()
+            travel_time = travel_time[order]
+            # Every profile is linear in the free-flow time, so one factor per road class is enough
+            for name, function in speed_profiles.weight_functions().items():
+                factors = np.array([function({'highway': hw, 'travel_time': 1.0}) for hw in HIGHWAY_CLASSES])
+                weights[name] = (travel_time * factors[self.highway[order]]).astype(np.float32)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+        return CSRGraph(np.arange(n, dtype=np.int64), self.x, self.y, offsets, targets, weights['length'],
+                        crs=self.crs, weights=weights)
+
+    def place_hospitals(self, n_hospitals, seed=0, spread=20.0):
+        """
+        Pick `n_hospitals` distinct nodes, favouring those on main roads as real hospitals are.
+        Returns (coords (n, 2), nodes) like search_closests_hospitals: the coordinates are
+        the building centroid, a few meters away from its street node.
+        """
+        rng = np.random.default_rng(seed)
+        n = self.number_of_nodes()
+        # Best road class touching each node: primary 4, secondary 3, tertiary 2, residential 1
+        score = np.ones(n)
+        np.maximum.at(score, self.u, 4 - self.highway)
+        n_hospitals = min(n_hospitals, n)
+        nodes = rng.choice(n, size=n_hospitals, replace=False, p=score / score.sum())
+        coords = np.column_stack((self.x[nodes], self.y[nodes])) + rng.normal(0, spread, size=(n_hospitals, 2))
+        return coords, nodes.astype(np.int64)
+
+
+# ------------------------------------------
+# Street layouts: every one returns node x, y and the undirected streets (a, b, class)
+# ------------------------------------------
+
+def _class_by_index(k):
+    # Every 10th street is an avenue, every 5th a collector
+    return np.where(k % 10 == 0, PRIMARY, np.where(k % 5 == 0, SECONDARY, RESIDENTIAL)).astype(np.int8)
+
+
+def _lattice(rows, cols, spacing, jitter, rng):
+    # rows x cols intersections, node i * cols + j is row i, column j
+    idx = np.arange(rows * cols)
+    i, j = np.divmod(idx, cols)
+    x = j * spacing + rng.uniform(-jitter, jitter, size=len(idx)) * spacing
+    y = i * spacing + rng.uniform(-jitter, jitter, size=len(idx)) * spacing
+
+    horizontal = idx[j < cols - 1]
+    vertical = idx[i < rows - 1]
+    a = np.concatenate((horizontal, vertical))
+    b = np.concatenate((horizontal + 1, vertical + cols))
+    cls = np.concatenate((_class_by_index(i[horizontal]), _class_by_index(j[vertical])))
+    return x, y, a, b, cls
+
+
+def _grid_layout(n_nodes, spacing, jitter, rng):
+    side = max(2, int(np.ceil(np.sqrt(n_nodes))))
+    return _lattice(side, side, spacing, jitter, rng)
+
+
+def _nearest_angle(angles, ref):
+    # Index of the closest angle of the (sorted) `ref` ring for every angle, wrapping around 2*pi
+    right = np.searchsorted(ref, angles) % len(ref)
+    left = (right - 1) % len(ref)
+    gap_left = np.abs((angles - ref[left] + np.pi) % (2 * np.pi) - np.pi)
+    gap_right = np.abs((angles - ref[right] + np.pi) % (2 * np.pi) - np.pi)
+    return np.where(gap_left <= gap_right, left, right)
+
+
+def _radial_layout(n_nodes, spacing, jitter, rng, n_spokes=8):
+    # Rings every `spacing` meters with about `spacing` between nodes: n ~ pi * rings^2
+    n_rings = max(1, int(round(np.sqrt(n_nodes / np.pi))))
+    xs, ys = [np.zeros(1)], [np.zeros(1)]
+    a, b, cls = [], [], []
+    spoke_angles = np.arange(n_spokes) * 2 * np.pi / n_spokes
+
+    prev_start, prev_angles = 0, np.zeros(1)
+    start = 1
+    for r in range(1, n_rings + 1):
+        m = max(6, int(round(2 * np.pi * r)))
+        angles = (np.arange(m) + rng.uniform(-jitter, jitter, size=m)) * 2 * np.pi / m
+        radius = r * spacing + rng.uniform(-jitter, jitter, size=m) * spacing
+        xs.append(radius * np.cos(angles))
+        ys.append(radius * np.sin(angles))
+        ring = start + np.arange(m)
+
+        # Ring road: every 8th ring is a beltway, every 4th a collector
+        a.append(ring)
+        b.append(np.roll(ring, -1))
+        ring_class = PRIMARY if r % 8 == 0 else SECONDARY if r % 4 == 0 else RESIDENTIAL
+        cls.append(np.full(m, ring_class, dtype=np.int8))
+
+        # Every node links inwards to the closest node (by angle) of the previous ring
+        inner = prev_start + _nearest_angle(angles, prev_angles)
+        a.append(ring)
+        b.append(inner)
+        # The links closest to the spoke angles form the radial avenues
+        spoke = np.zeros(m, dtype=bool)
+        spoke[_nearest_angle(spoke_angles, angles)] = True
+        cls.append(np.where(spoke, PRIMARY, TERTIARY if r % 2 == 0 else RESIDENTIAL).astype(np.int8))
+
+        prev_start, prev_angles = start, angles
+        start += m
+
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(a), np.concatenate(b), np.concatenate(cls)
+
+
+def _planar_layout(n_nodes, spacing, jitter, rng, arterial_every=10):
+    # Random intersections joined by a Gabriel graph: planar, average degree close to 4
+    side = np.sqrt(n_nodes) * spacing
+    points = rng.uniform(0, side, size=(n_nodes, 2))
+    simplices = Delaunay(points).simplices
+    edges = np.concatenate((simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]))
+    edges = np.sort(edges, axis=1).astype(np.int64)
+    # Each interior edge belongs to two triangles, keep it once (a 1D unique is much faster than axis=0)
+    keys = np.unique(edges[:, 0] * n_nodes + edges[:, 1])
+    edges = np.column_stack(np.divmod(keys, n_nodes))
+
+    # Gabriel test: no other point inside the circle that has the edge as diameter
+    mid = (points[edges[:, 0]] + points[edges[:, 1]]) / 2
+    radius = np.hypot(*(points[edges[:, 0]] - points[edges[:, 1]]).T) / 2
+    nearest, _ = cKDTree(points).query(mid)
+    edges = edges[nearest >= radius * (1 - 1e-9)]
+
+    # Streets close to a coarse grid of lines, and running along them, are the avenues
+    a, b = edges[:, 0], edges[:, 1]
+    mid = (points[a] + points[b]) / 2
+    d = points[b] - points[a]
+    period = arterial_every * spacing
+    off = np.abs((mid + period / 2) % period - period / 2)
+    along_x = (np.abs(d[:, 0]) > np.abs(d[:, 1])) & (off[:, 1] < spacing / 2)
+    along_y = (np.abs(d[:, 1]) >= np.abs(d[:, 0])) & (off[:, 0] < spacing / 2)
+    cls = np.where(along_x | along_y, PRIMARY, RESIDENTIAL).astype(np.int8)
+    return points[:, 0], points[:, 1], a, b, cls
+
+
+LAYOUTS = {'grid': _grid_layout, 'radial': _radial_layout, 'planar': _planar_layout}
+
+
+def generate_city(kind='grid', n_nodes=10000, spacing=100.0, jitter=0.1, oneway=0.15, dead_ends=0.08,
+                  cul_de_sacs=0.05, seed=0, crs=DEFAULT_CRS, origin=DEFAULT_ORIGIN):
+    """
+    Synthetic street network of about `n_nodes` intersections `spacing` meters apart.
+
+    - kind: 'grid' (Manhattan-like), 'radial' (rings and spokes) or 'planar' (random
+      intersections, Gabriel graph)
+    - oneway: share of residential streets that become one-way, in a random direction
+    - dead_ends: share of residential streets removed, leaving cul-de-sacs and T junctions
+      so the degree distribution looks like a real city instead of a perfect lattice
+    - cul_de_sacs: share of intersections that get a short residential dead-end street
+
+    Only the largest strongly connected component is kept (as OSMnx does), so every
+    node can reach every other. The same arguments always give the same city.
+    """
+    if kind not in LAYOUTS:
+        raise ValueError(f"Unknown kind '{kind}', expected one of {', '.join(KINDS)}")
+    rng = np.random.default_rng(seed)
+    x, y, a, b, cls = LAYOUTS[kind](n_nodes, spacing, jitter, rng)
+
+    # Dead-end streets: a new node a third of a block away from a random intersection
+    stubs = np.flatnonzero(rng.random(len(x)) < cul_de_sacs)
+    angle = rng.uniform(0, 2 * np.pi, size=len(stubs))
+    ends = len(x) + np.arange(len(stubs))
+    x = np.concatenate((x, x[stubs] + spacing / 3 * np.cos(angle)))
+    y = np.concatenate((y, y[stubs] + spacing / 3 * np.sin(angle)))
+    a = np.concatenate((a, stubs))
+    b = np.concatenate((b, ends))
+    cls = np.concatenate((cls, np.full(len(stubs), RESIDENTIAL, dtype=np.int8)))
+    x = x - x.min() + origin[0]
+    y = y - y.min() + origin[1]
+
+    residential = cls == RESIDENTIAL
+    keep = ~(residential & (rng.random(len(a)) < dead_ends))
+    a, b, cls, residential = a[keep], b[keep], cls[keep], residential[keep]
+
+    # One-way streets keep a random direction, two-way streets get both
+    is_oneway = residential & (rng.random(len(a)) < oneway)
+    flip = is_oneway & (rng.random(len(a)) < 0.5)
+    a, b = np.where(flip, b, a), np.where(flip, a, b)
+    street = np.arange(len(a))
+    two_way = ~is_oneway
+    u = np.concatenate((a, b[two_way]))
+    v = np.concatenate((b, a[two_way]))
+    highway = np.concatenate((cls, cls[two_way]))
+    oneway_edge = np.concatenate((is_oneway, is_oneway[two_way]))
+    street = np.concatenate((street, street[two_way]))
+
+    # Largest strongly connected component, renumbered 0..n-1
+    n = len(x)
+    matrix = csr_matrix((np.ones(len(u), dtype=np.int8), (u, v)), shape=(n, n))
+    _, labels = connected_components(matrix, directed=True, connection='strong')
+    main = labels == np.argmax(np.bincount(labels))
+    new_id = np.cumsum(main) - 1
+    edge_keep = main[u] & main[v]
+
+    name = f"synthetic_{kind}_{n_nodes}_{seed}"
+    return SyntheticCity(
+        name, x[main], y[main], new_id[u[edge_keep]].astype(np.int64), new_id[v[edge_keep]].astype(np.int64),
+        highway[edge_keep], oneway_edge[edge_keep], street[edge_keep], crs=crs,
+    )
@@ -0,0 +1,199 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import Interface.route_emergency as engine
+import Interface.snapshot as snapshot
+import Interface.speed_profiles as speed_profiles
+from Interface.csr_graph import CSRGraph
+from Interface.distance_field import HospitalDistanceField
+from Interface.isochrones import isochrone_polygon
+from Interface.graph_updates import GraphUpdates
+from Route_Planning.search_stats import SearchStats
+from Route_Planning.search_budget import CancelToken
+from Route_Planning.Uninformed_Agorithm import (
+    ucs_search, a_star_search, bidirectional_ucs_search, bidirectional_a_star_search,
+)
+
+# Searches whose expansion order can be exported with compute_search_trace
+TRACEABLE_SEARCHES = {
+    'ucs': ucs_search,
+    'a_star': a_star_search,
+    'bi_ucs': bidirectional_ucs_search,
+    'bi_a_star': bidirectional_a_star_search,
+}
+
+# Routing state of this process. The server fills it before the pool starts, so
+# forked workers inherit it copy-on-write. Spawned workers (Windows, macOS) find it
+# empty and load it themselves from the snapshot. Edge changes made later in the
+# server reach the workers through `run_synced`.
+_state = {}
+
+# One cancel flag per in-flight search, in shared memory so the server can stop a
+# search running in a worker (see SharedCancelToken). Created by create_pool.
+CANCEL_SLOTS = 256
+_cancel_flags = None
+_free_slots = []
+
+
+class SharedCancelToken:
+    """
+    CancelToken backed by one byte of the shared flag array. Only the slot number
+    is pickled, the worker reads the array it inherited when it started.
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def cancel(self):
+        _cancel_flags[self.slot] = 1
+
+    def is_cancelled(self):
+        return _cancel_flags[self.slot] != 0
+
+
+def acquire_cancel_token():
+    """
+    Token for one request. Shared with the pool when there is one and a slot is free,
+    otherwise a plain CancelToken (enough for the threadpool, where nothing is pickled).
+    """
+    if _cancel_flags is None or not _free_slots:
+        return CancelToken()
+    slot = _free_slots.pop()
+    _cancel_flags[slot] = 0
+    return SharedCancelToken(slot)
+
+
+def release_cancel_token(token):
+    # Only once the search that used it has returned, or a new request could reset its flag
+    if isinstance(token, SharedCancelToken):
+        _free_slots.append(token.slot)
+
+
+def set_state(G_csr, hosp_coords, hosp_nodes, fields=None, hospital_index=None, ch=None, capacity=None, updates=None):
+    # `fields` is {weight name: HospitalDistanceField}, one per weight profile
+    fields = fields or {}
+    _state.update(
+        updates=updates if updates is not None else GraphUpdates(G_csr, fields),
+        G_csr=G_csr,
+        hosp_coords=hosp_coords,
+        hosp_nodes=hosp_nodes,
+        fields=fields,
+        hospital_index=hospital_index,
+        ch=ch,
+        capacity=capacity,
+    )
+
+
+def _init_worker(snapshot_path, cancel_flags=None):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    if _state:
+        return
+    G, hosp_coords, hosp_nodes = snapshot.load_snapshot(snapshot_path)
+    speed_profiles.ensure_travel_times(G)
+    G_csr = CSRGraph.from_networkx(G, profiles=speed_profiles.weight_functions())
+    set_state(
+        G_csr, hosp_coords, hosp_nodes,
+        fields={w: HospitalDistanceField(G_csr, hosp_nodes, weight=w) for w in G_csr.weights},
+        hospital_index=engine.HospitalIndex(hosp_coords, hosp_nodes),
+        ch=snapshot.load_ch(snapshot_path),
+        capacity=snapshot.load_capacity(snapshot_path),
+    )
+
+
+def _ping():
+    return os.getpid()
+
+
+def run_synced(changes, func, *args):
+    """Runs in a worker: replay the server's edge changes (see GraphUpdates.sync), then run `func`."""
+    _state['updates'].sync(changes)
+    return func(*args)
+
+
+def run_budgeted(func, budget, *args):
+    """
+    Runs `func(*args, budget=budget)` and returns (result, budget.reason). In a worker the
+    budget is a pickled copy, so the reason it ran out would be lost otherwise.
+    """
+    return func(*args, budget=budget), budget.reason
+
+
+def _ch_for(weight):
+    # The CH is preprocessed on the original lengths, edited lengths make it stale
+    if weight != 'length' or 'length' in _state['updates'].modified_weights():
+        return None
+    return _state['ch']
+
+
+def compute_route(origin_node, weight='length', budget=None):
+    """
+    Runs in a worker: route from `origin_node` to its hospital.
+    Returns (route, hospital node, stats), stats as filled by emergency_routing_system.
+    """
+    stats = {}
+    route, hospital_node = engine.emergency_routing_system(
+        _state['G_csr'], _state['hosp_coords'], _state['hosp_nodes'],
+        origin_node=origin_node, field=_state['fields'].get(weight), hospital_index=_state['hospital_index'],
+        weight=weight, stats=stats, budget=budget,
+    )
+    return route, hospital_node, stats
+
+
+def compute_point_to_point(origin_node, target_node, weight='length', budget=None):
+    """Runs in a worker: route between two nodes, with the CH when one was loaded."""
+    # The CH is preprocessed on lengths, other weights (and edited lengths) use a bidirectional
+    # Dijkstra that stops with the budget, scipy's full-graph Dijkstra could not be cancelled
+    ch = _ch_for(weight)
+    if ch is not None:
+        return ch.shortest_path(origin_node, target_node, budget=budget)
+    return bidirectional_ucs_search(_state['G_csr'], origin_node, target_node, timeout=None, budget=budget,
+                                    weight=weight)
+
+
+def compute_route_batch(origin_nodes, weight='length'):
+    """Runs in a worker: list of (route, hospital node, cost) for many origins."""
+    return _state['fields'][weight].route_batch(origin_nodes)
+
+
+def compute_k_nearest(origin_node, k, weight='length', budget=None):
+    """Runs in a worker: the k best hospitals for `origin_node`, skipping hospitals without capacity."""
+    return _state['fields'][weight].k_nearest(origin_node, k=k, capacity=_state['capacity'], budget=budget)
+
+
+def compute_isochrones(hospital_nodes, limit, weight='time'):
+    """Runs in a worker: reachable-area polygon (projected CRS) for every hospital node."""
+    return [isochrone_polygon(_state['G_csr'], node, limit, weight=weight) for node in hospital_nodes]
+
+
+def compute_search_trace(origin_node, target_node, algorithm, budget=None):
+    """
+    Runs in a worker: one search (on lengths) that records its expansion order.
+    Returns (route, expanded nodes in order, counters of the SearchStats).
+    """
+    stats = SearchStats(trace=True)
+    route = TRACEABLE_SEARCHES[algorithm](_state['G_csr'], origin_node, target_node, stats=stats, budget=budget)
+    return route, stats.trace, dict(stats)
+
+
+def create_pool(n_workers, snapshot_path=snapshot.DEFAULT_PATH):
+    """
+    Process pool for route computation. Uses fork where available so workers share
+    the parent's graph pages instead of loading their own copy.
+    """
+    global _cancel_flags
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    context = mp.get_context(method)
+    # Shared memory has to reach the workers when they start, it cannot be pickled per task
+    _cancel_flags = context.RawArray('b', CANCEL_SLOTS)
+    _free_slots[:] = range(CANCEL_SLOTS)
+    pool = ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(snapshot_path, _cancel_flags),
+    )
+    # Start the workers now, while the server has no other threads running yet
+    for future in [pool.submit(_ping) for _ in range(n_workers)]:
+        future.result()
+    return pool
@@ -4,7 +4,13 @@ import heapq
 import time
 import math
 import random
+import weakref
 from collections import deque
+from Interface.csr_graph import CSRGraph
+from Route_Planning.contraction_hierarchies import ContractionHierarchy
+from Route_Planning.landmarks import Landmarks
+from Route_Planning.search_stats import instrument, record
+from Route_Planning.search_budget import SearchBudget
 
 # ==========================================
 # 1. PREPARACIÓN DEL GRAFO Y HEURÍSTICA
@@ -12,8 +18,80 @@ from collections import deque
 
 def get_coordinates(G, node):
     """Obtiene coordenadas (y, x) del nodo. En grafo proyectado son metros."""
+    if isinstance(G, CSRGraph):
+        x, y = G.coords(node)
+        return y, x
     return G.nodes[node]['y'], G.nodes[node]['x']
 
+# Adyacencias precalculadas por grafo; se liberan solas cuando el grafo deja de existir.
+# Cada una guarda la versión del grafo con la que se construyó (ver graph_version)
+_adjacency_cache = weakref.WeakKeyDictionary()
+
+def build_adjacency(G, weight='length'):
+    """
+    Construye una sola vez las listas {nodo: [(vecino, peso)]} hacia adelante y hacia atrás.
+    En un MultiDiGraph puede haber varias aristas paralelas u -> v; se queda la de
+    menor peso, que es la que usaría la ruta más corta.
+    """
+    best = {}
+    for u, v, w in G.edges(data=weight, default=1):
+        if w < best.get((u, v), float('inf')):
+            best[(u, v)] = w
+
+    successors = {node: [] for node in G.nodes}
+    predecessors = {node: [] for node in G.nodes}
+    for (u, v), w in best.items():
+        successors[u].append((v, w))
+        predecessors[v].append((u, w))
+    return successors, predecessors
+
+def graph_version(G):
+    """
+    Versión de G para el caché de adyacencias: `G.graph['version']`, que sube
+    invalidate_adjacency. Es O(1); contar nodos y aristas recorre todo el grafo en
+    cada búsqueda, así que al modificar G hay que llamar invalidate_adjacency.
+    """
+    return G.graph.get('version', 0)
+
+def get_adjacency(G):
+    """Adyacencias de G desde el caché; se reconstruyen si la versión del grafo cambió."""
+    version = graph_version(G)
+    cached = _adjacency_cache.get(G)
+    if cached is None or cached[0] != version:
+        cached = (version, build_adjacency(G))
+        _adjacency_cache[G] = cached
+    return cached[1]
+
+def invalidate_adjacency(G):
+    """Descarta las adyacencias de G y sube su versión, para cuando se modifican sus aristas."""
+    G.graph['version'] = G.graph.get('version', 0) + 1
+    _adjacency_cache.pop(G, None)
+
+def successors_fn(G, weight=None):
+    """
+    Función nodo -> [(vecino, peso)]; se obtiene una vez antes del ciclo de búsqueda.
+    `weight` elige el perfil de un CSRGraph ('length', 'time', ...), networkx usa 'length'.
+    """
+    if isinstance(G, CSRGraph):
+        return G.expand_fn(weight)
+    return get_adjacency(G)[0].__getitem__
+
+def predecessors_fn(G, weight=None):
+    """Función nodo -> [(predecesor, peso)], la adyacencia inversa."""
+    if isinstance(G, CSRGraph):
+        return G.expand_fn(weight, reverse=True)
+    return get_adjacency(G)[1].__getitem__
+
+def adjacency_fns(G, weight=None):
+    """
+    (sucesores, predecesores) como las dos funciones anteriores, con una sola
+    consulta al caché de adyacencias.
+    """
+    if isinstance(G, CSRGraph):
+        return G.expand_fn(weight), G.expand_fn(weight, reverse=True)
+    successors, predecessors = get_adjacency(G)
+    return successors.__getitem__, predecessors.__getitem__
+
 def heuristic(G, node, goal):
     """
     Calcula la distancia Euclidiana.
@@ -24,92 +102,328 @@ def heuristic(G, node, goal):
     return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
 
 # ==========================================
-# 2. ALGORITMOS CON TIMEOUT (Para evitar congelamientos)
+# 2. ALGORITMOS CON PRESUPUESTO (Para evitar congelamientos)
 # ==========================================
 
-def bfs_search(G, start, goal, timeout=20):
-    """BFS con límite de tiempo"""
-    t_start = time.time()
-    queue = deque([(start, [start])])
-    visited = set([start])
-
+def reconstruct_path(parents, goal):
+    """
+    Reconstruye el camino siguiendo los padres desde la meta hasta el inicio.
+    Se hace una sola vez al llegar a la meta, en lugar de copiar el camino en cada push.
+    """
+    path = [goal]
+    parent = parents[goal]
+    while parent is not None:
+        path.append(parent)
+        parent = parents[parent]
+    path.reverse()
+    return path
+
+def bfs_search(G, start, goal, timeout=20, stats=None, budget=None):
+    """
+    BFS con presupuesto: `budget` (SearchBudget) o, si no se da, `timeout` en segundos.
+    `stats` puede ser un dict o un SearchStats.
+    """
+    budget = SearchBudget.resolve(budget, timeout)
+    queue = deque([start])
+    # parents también sirve como conjunto de visitados
+    parents = {start: None}
+    push, pop, expand = instrument(stats, queue.append, queue.popleft, G.neighbors)
+
+    iterations = 0
+    next_check = budget.first_check()
     while queue:
-        if time.time() - t_start > timeout: return None 
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None: break
+        iterations += 1
 
-        current, path = queue.popleft()
+        current = pop()
 
         if current == goal:
-            return path
-
-        for neighbor in G.neighbors(current):
-            if neighbor not in visited:
-                visited.add(neighbor)
-                queue.append((neighbor, path + [neighbor]))
+            record(stats, len(parents) - len(queue) - 1)
+            return reconstruct_path(parents, goal)
+
+        for neighbor in expand(current):
+            if neighbor not in parents:
+                parents[neighbor] = current
+                push(neighbor)
+    record(stats, len(parents) - len(queue))
     return None
 
-def dfs_search(G, start, goal, timeout=20):
-    """DFS con límite de tiempo"""
-    t_start = time.time()
-    stack = [(start, [start])]
-    visited = set([start])
+def dfs_search(G, start, goal, timeout=20, stats=None, budget=None):
+    """DFS con presupuesto (`budget` o `timeout`). `stats` puede ser un dict o un SearchStats."""
+    budget = SearchBudget.resolve(budget, timeout)
+    stack = [start]
+    parents = {start: None}
+    push, pop, expand = instrument(stats, stack.append, stack.pop, G.neighbors)
 
+    iterations = 0
+    next_check = budget.first_check()
     while stack:
-        if time.time() - t_start > timeout: return None 
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None: break
+        iterations += 1
         
-        current, path = stack.pop()
+        current = pop()
 
         if current == goal:
-            return path
+            record(stats, len(parents) - len(stack) - 1)
+            return reconstruct_path(parents, goal)
         
-        for neighbor in G.neighbors(current):
-            if neighbor not in visited:
-                visited.add(neighbor)
-                stack.append((neighbor, path + [neighbor]))
+        for neighbor in expand(current):
+            if neighbor not in parents:
+                parents[neighbor] = current
+                push(neighbor)
+    record(stats, len(parents) - len(stack))
     return None
 
-def iddfs_search(G, start, goal, max_depth=50, timeout=20):
-    """IDDFS con límite de tiempo y profundidad"""
-    t_start = time.time()
+def iddfs_search(G, start, goal, max_depth=50, timeout=20, stats=None, budget=None):
+    """
+    IDDFS con presupuesto (`budget` o `timeout`) y límite de profundidad. Cada llamada
+    recursiva cuenta como una iteración. Con un SearchStats solo cuenta expansiones
+    y aristas (no hay frontera explícita, es recursivo).
+    """
+    budget = SearchBudget.resolve(budget, timeout)
+    _, _, expand = instrument(stats, None, None, G.neighbors)
+    expanded = 0
+    iterations = 0
+    next_check = budget.first_check()
 
     def dls(current, goal, depth, path, visited_in_path):
-        # Chequeo de tiempo en cada paso recursivo
-        if time.time() - t_start > timeout: return "TIMEOUT"
+        nonlocal expanded, iterations, next_check
+        # El presupuesto se revisa cada `check_every` pasos recursivos
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None: return "AGOTADO"
+        iterations += 1
 
         if current == goal:
             return path
         if depth <= 0:
             return None
         
-        for neighbor in G.neighbors(current):
+        expanded += 1
+        for neighbor in expand(current):
             if neighbor not in visited_in_path:
                 visited_in_path.add(neighbor)
                 result = dls(neighbor, goal, depth - 1, path + [neighbor], visited_in_path)
-                if result == "TIMEOUT": return "TIMEOUT"
+                if result == "AGOTADO": return "AGOTADO"
                 if result: return result
                 visited_in_path.remove(neighbor)
         return None
 
     # Iteramos profundidad
     for limit in range(1, max_depth + 1, 5): 
-        if time.time() - t_start > timeout: return None
-        
         visited = set([start])
         result = dls(start, goal, limit, [start], visited)
-        if result == "TIMEOUT": return None
+        if result == "AGOTADO": break
         if result:
+            record(stats, expanded)
             return result
+    record(stats, expanded)
     return None
 
 # ==========================================
-# 3. ALGORITMOS INFORMADOS CON TIMEOUT
+# 3. ALGORITMOS INFORMADOS CON PRESUPUESTO
 # ==========================================
 
-def ucs_search(G, start, goal, timeout=20):
-    """UCS (Dijkstra) con límite de tiempo"""
+def ucs_search(G, start, goal, timeout=20, stats=None, budget=None):
+    """UCS (Dijkstra) con presupuesto (`budget` o `timeout`). `stats` puede ser un dict o un SearchStats."""
+    budget = SearchBudget.resolve(budget, timeout)
+    pq = [(0, start)]
+    visited = set()
+    cost_so_far = {start: 0}
+    parents = {start: None}
+    push, pop, expand = instrument(stats, heapq.heappush, heapq.heappop, successors_fn(G))
+
+    iterations = 0
+    next_check = budget.first_check()
+    while pq:
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None: break
+        iterations += 1
+
+        current_cost, current = pop(pq)
+
+        if current == goal:
+            record(stats, len(visited))
+            return reconstruct_path(parents, goal)
+        
+        if current in visited:
+            continue
+        visited.add(current)
+
+        for neighbor, weight in expand(current):
+            new_cost = current_cost + weight
+            
+            if new_cost < cost_so_far.get(neighbor, float('inf')):
+                cost_so_far[neighbor] = new_cost
+                parents[neighbor] = current
+                push(pq, (new_cost, neighbor))
+    record(stats, len(visited))
+    return None
+
+def a_star_search(G, start, goal, timeout=20, heuristic_fn=heuristic, stats=None, budget=None):
+    """
+    A* con presupuesto (`budget` o `timeout`).
+    `heuristic_fn(G, node, goal)` permite cambiar la heurística, por ejemplo por
+    `Landmarks.heuristic` (ALT). Si se pasa un dict en `stats` se guarda ahí
+    cuántos nodos se expandieron; un SearchStats además cuenta la frontera.
+    """
+    budget = SearchBudget.resolve(budget, timeout)
+    pq = [(0, 0, start)]
+    visited = set()
+    g_costs = {start: 0}
+    parents = {start: None}
+    expanded = 0
+    push, pop, expand = instrument(stats, heapq.heappush, heapq.heappop, successors_fn(G))
+
+    iterations = 0
+    next_check = budget.first_check()
+    while pq:
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None: break
+        iterations += 1
+
+        _, current_g, current = pop(pq)
+
+        if current == goal:
+            record(stats, expanded)
+            return reconstruct_path(parents, goal)
+        
+        if current in visited and current_g > g_costs.get(current, float('inf')):
+            continue
+        visited.add(current)
+        expanded += 1
+
+        for neighbor, weight in expand(current):
+            new_g = current_g + weight
+            
+            if new_g < g_costs.get(neighbor, float('inf')):
+                g_costs[neighbor] = new_g
+                parents[neighbor] = current
+                h = heuristic_fn(G, neighbor, goal)
+                f = new_g + h
+                push(pq, (f, new_g, neighbor))
+    record(stats, expanded)
+    return None
+
+# ==========================================
+# 3b. BÚSQUEDAS BIDIRECCIONALES
+# ==========================================
+
+def _bidirectional_search(G, start, goal, timeout, potential, stats, budget=None, weight=None):
+    """
+    Dijkstra bidireccional con potencial: hacia adelante desde `start` con las aristas
+    salientes y hacia atrás desde `goal` con las entrantes. Las llaves son
+    d_adelante(v) + p(v) y d_atras(v) - p(v); con `potential` None es Dijkstra normal.
+    Se detiene cuando la suma de los mínimos de ambas colas ya no puede mejorar
+    la mejor ruta encontrada (criterio de paro correcto para grafos dirigidos).
+    """
+    if start == goal:
+        record(stats, 0)
+        return [start]
+
+    budget = SearchBudget.resolve(budget, timeout)
+    inf = float('inf')
+    push, pop, (expand_f, expand_b) = instrument(stats, heapq.heappush, heapq.heappop, adjacency_fns(G, weight),
+                                                 frontier=2)
+    dist_f, dist_b = {start: 0}, {goal: 0}
+    parents_f, parents_b = {start: None}, {goal: None}
+    settled_f, settled_b = set(), set()
+    heap_f = [(potential(start) if potential else 0, start)]
+    heap_b = [(-potential(goal) if potential else 0, goal)]
+    # Todo lo de cada dirección en una tupla, se desempaca una vez por pop
+    forward = (heap_f, dist_f, parents_f, settled_f, expand_f, 1, dist_b)
+    backward = (heap_b, dist_b, parents_b, settled_b, expand_b, -1, dist_f)
+    best = inf
+    meeting = None
+    iterations = 0
+    next_check = budget.first_check()
+
+    while heap_f and heap_b:
+        if iterations == next_check:
+            next_check = budget.next_check(iterations)
+            if next_check is None:
+                # Sin presupuesto la mejor ruta encontrada puede no ser la más corta
+                record(stats, len(settled_f) + len(settled_b))
+                return None
+        iterations += 1
+
+        key_f = heap_f[0][0]
+        key_b = heap_b[0][0]
+        if key_f + key_b >= best:
+            break
+
+        # Avanza la dirección con la llave más pequeña
+        heap, dist, parents, settled, expand, sign, other_dist = forward if key_f <= key_b else backward
+        _, current = pop(heap)
+        if current in settled:
+            continue
+        settled.add(current)
+
+        current_cost = dist[current]
+        for neighbor, weight in expand(current):
+            new_cost = current_cost + weight
+            if new_cost < dist.get(neighbor, inf):
+                dist[neighbor] = new_cost
+                parents[neighbor] = current
+                push(heap, (new_cost + sign * potential(neighbor) if potential else new_cost, neighbor))
+
+            # ¿La otra búsqueda ya llegó aquí? Entonces hay una ruta completa
+            other_cost = other_dist.get(neighbor)
+            if other_cost is not None and new_cost + other_cost < best:
+                best = new_cost + other_cost
+                meeting = neighbor
+
+    record(stats, len(settled_f) + len(settled_b))
+    if meeting is None:
+        return None
+
+    # start -> meeting con los padres de adelante, meeting -> goal con los de atrás
+    path = reconstruct_path(parents_f, meeting)
+    node = parents_b[meeting]
+    while node is not None:
+        path.append(node)
+        node = parents_b[node]
+    return path
+
+def bidirectional_ucs_search(G, start, goal, timeout=20, stats=None, budget=None, weight=None):
+    """
+    UCS (Dijkstra) bidireccional con presupuesto (`budget` o `timeout`). En un CSRGraph
+    `weight` elige el perfil de costo; sin él se usan las longitudes.
+    """
+    return _bidirectional_search(G, start, goal, timeout, None, stats, budget, weight)
+
+def bidirectional_a_star_search(G, start, goal, timeout=20, heuristic_fn=heuristic, stats=None, budget=None,
+                                potential_fn=None):
+    """
+    A* bidireccional con potencial promedio p(v) = (h(v, goal) - h(start, v)) / 2,
+    que es consistente en ambas direcciones. Solo hacen falta h(v, goal) y h(start, v),
+    con `start` y `goal` fijos en toda la consulta. `potential_fn(start, goal)` da ese
+    potencial ya precalculado (por ejemplo `Landmarks.pair_potential` para ALT) y
+    reemplaza a `heuristic_fn`.
+    """
+    if potential_fn is not None:
+        potential = potential_fn(start, goal)
+    else:
+        def potential(node):
+            return (heuristic_fn(G, node, goal) - heuristic_fn(G, start, node)) / 2
+    return _bidirectional_search(G, start, goal, timeout, potential, stats, budget)
+
+# Versiones anteriores, copian `path + [neighbor]` en cada push (O(profundidad) por push).
+# Solo se conservan para comparar en el benchmark contra las versiones con padres.
+
+def ucs_search_copia(G, start, goal, timeout=20):
+    """UCS que guarda el camino completo en la cola (versión anterior)"""
     t_start = time.time()
     pq = [(0, start, [start])]
     visited = set()
     cost_so_far = {start: 0}
+    expand = successors_fn(G)
 
     while pq:
         if time.time() - t_start > timeout: return None
@@ -123,10 +437,7 @@ def ucs_search(G, start, goal, timeout=20):
             continue
         visited.add(current)
 
-        for neighbor in G.neighbors(current):
-            edge_data = G.get_edge_data(current, neighbor)[0]
-            # En grafo proyectado 'length' está en metros
-            weight = edge_data.get('length', 1)
+        for neighbor, weight in expand(current):
             new_cost = current_cost + weight
             
             if new_cost < cost_so_far.get(neighbor, float('inf')):
@@ -134,12 +445,13 @@ def ucs_search(G, start, goal, timeout=20):
                 heapq.heappush(pq, (new_cost, neighbor, path + [neighbor]))
     return None
 
-def a_star_search(G, start, goal, timeout=20):
-    """A* con límite de tiempo"""
+def a_star_search_copia(G, start, goal, timeout=20):
+    """A* que guarda el camino completo en la cola (versión anterior)"""
     t_start = time.time()
     pq = [(0, 0, start, [start])]
     visited = set()
     g_costs = {start: 0}
+    expand = successors_fn(G)
 
     while pq:
         if time.time() - t_start > timeout: return None
@@ -153,10 +465,7 @@ def a_star_search(G, start, goal, timeout=20):
             continue
         visited.add(current)
 
-        for neighbor in G.neighbors(current):
-            edge_data = G.get_edge_data(current, neighbor)[0]
-            weight = edge_data.get('length', 1)
-            
+        for neighbor, weight in expand(current):
             new_g = current_g + weight
             
             if new_g < g_costs.get(neighbor, float('inf')):
@@ -170,6 +479,11 @@ def a_star_search(G, start, goal, timeout=20):
 # 4. BENCHMARKING (CORREGIDO)
 # ==========================================
 
+def path_cost(G, path):
+    """Suma de pesos de la ruta, con la arista paralela más barata como las búsquedas."""
+    expand = successors_fn(G)
+    return sum(min(w for v, w in expand(u) if v == nxt) for u, nxt in zip(path[:-1], path[1:]))
+
 def get_distance_km(G, u, v):
     """
     CORRECCIÓN: Usa distancia Euclidiana porque el grafo está proyectado en metros.
@@ -233,36 +547,67 @@ def run_benchmark():
     
     # 3. Generar Pares
     test_suite = generate_test_pairs(G, num_pairs=3)
+
+    # Copia compacta en arreglos (CSR) para comparar contra los dicts de networkx
+    G_csr = CSRGraph.from_networkx(G)
+
+    # Preprocesamiento de Contraction Hierarchies (se hace una sola vez, fuera de la medición)
+    t0 = time.time()
+    ch = ContractionHierarchy.build(G_csr)
+    print(f"Contraction Hierarchies: preprocesamiento en {time.time() - t0:.1f} s")
+
+    # Landmarks para ALT (distancias desde y hacia cada landmark)
+    t0 = time.time()
+    landmarks = Landmarks.build(G_csr, k=8)
+    print(f"ALT: {len(landmarks.landmark_idx)} landmarks en {time.time() - t0:.1f} s")
     
     # 4. Configurar algoritmos con timeout
     TIMEOUT = 10 # Segundos
+    # Las funciones reciben (grafo, inicio, meta, stats); las que cuentan nodos los guardan en stats
     algorithms = {
-        "BFS": lambda g, s, e: bfs_search(g, s, e, timeout=TIMEOUT),
-        "DFS": lambda g, s, e: dfs_search(g, s, e, timeout=TIMEOUT),
-        "UCS": lambda g, s, e: ucs_search(g, s, e, timeout=TIMEOUT),
-        "A*": lambda g, s, e: a_star_search(g, s, e, timeout=TIMEOUT),
-        "IDDFS": lambda g, s, e: iddfs_search(g, s, e, max_depth=50, timeout=TIMEOUT)
+        "BFS": lambda g, s, e, st: bfs_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "DFS": lambda g, s, e, st: dfs_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "UCS": lambda g, s, e, st: ucs_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "UCS (copia)": lambda g, s, e, st: ucs_search_copia(g, s, e, timeout=TIMEOUT),
+        "A*": lambda g, s, e, st: a_star_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "A* (copia)": lambda g, s, e, st: a_star_search_copia(g, s, e, timeout=TIMEOUT),
+        "A* ALT": lambda g, s, e, st: a_star_search(g, s, e, timeout=TIMEOUT, heuristic_fn=landmarks.heuristic, stats=st),
+        "Bi-UCS": lambda g, s, e, st: bidirectional_ucs_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "Bi-A*": lambda g, s, e, st: bidirectional_a_star_search(g, s, e, timeout=TIMEOUT, stats=st),
+        "Bi-A* ALT": lambda g, s, e, st: bidirectional_a_star_search(g, s, e, timeout=TIMEOUT,
+                                                                    potential_fn=landmarks.pair_potential, stats=st),
+        "UCS (CSR)": lambda g, s, e, st: ucs_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+        "A* (CSR)": lambda g, s, e, st: a_star_search(G_csr, s, e, timeout=TIMEOUT, stats=st),
+        "CH": lambda g, s, e, st: ch.shortest_path(s, e, stats=st),
+        "IDDFS": lambda g, s, e, st: iddfs_search(g, s, e, max_depth=50, timeout=TIMEOUT, stats=st)
     }
     
-    print("\n" + "="*80)
-    print(f"{'CATEGORÍA':<20} | {'ALGORITMO':<10} | {'TIEMPO (s)':<12} | {'ESTADO'}")
-    print("="*80)
+    print("\n" + "="*95)
+    print(f"{'CATEGORÍA':<20} | {'ALGORITMO':<12} | {'TIEMPO (s)':<12} | {'NODOS EXP.':<10} | {'ESTADO'}")
+    print("="*95)
     
+    averages = {}
+    # Costo de cada ruta por (algoritmo, inicio, meta) para comparar ALT contra Bi-UCS
+    costs = {}
     for category, pairs in test_suite.items():
         print(f"--- {category} ---")
         for name, func in algorithms.items():
             total_time = 0
+            total_expanded = 0
             successes = 0
             timeouts = 0
             
             for start, goal in pairs:
+                stats = {}
                 t0 = time.time()
                 try:
-                    path = func(G, start, goal)
+                    path = func(G, start, goal, stats)
                     dur = time.time() - t0
                     
                     if path:
+                        costs[(name, start, goal)] = path_cost(G, path)
                         total_time += dur
+                        total_expanded += stats.get('expanded', 0)
                         successes += 1
                     else:
                         timeouts += 1
@@ -271,10 +616,32 @@ def run_benchmark():
             
             if successes > 0:
                 avg = total_time / successes
+                averages[(category, name)] = avg
+                expanded = f"{total_expanded // successes}" if total_expanded else "--"
                 # El time out son checkpoints para poner un limite de tiempo
-                print(f"{'':<20} | {name:<10} | {avg:.6f} s   | {successes} Ok / {timeouts} T.O.")
+                print(f"{'':<20} | {name:<12} | {avg:.6f} s   | {expanded:<10} | {successes} Ok / {timeouts} T.O.")
             else:
-                print(f"{'':<20} | {name:<10} | --             | Tiempo Excedido")
+                print(f"{'':<20} | {name:<12} | --             | {'--':<10} | Tiempo Excedido")
+
+    # Antes/después de usar padres en lugar de copiar caminos, en rutas largas
+    category = "Larga (>5 km)"
+    print("\n" + "="*95)
+    print(f"Padres vs copia de caminos en {category}")
+    for name in ("UCS", "A*"):
+        before = averages.get((category, f"{name} (copia)"))
+        after = averages.get((category, name))
+        if before and after:
+            print(f"  {name:<4}: {before:.6f} s -> {after:.6f} s ({before / after:.2f}x)")
+        else:
+            print(f"  {name:<4}: sin datos suficientes")
+
+    # Las cotas de los landmarks son admisibles: Bi-A* ALT debe dar el mismo costo que Bi-UCS
+    mismatches = [
+        (start, goal) for pairs in test_suite.values() for start, goal in pairs
+        if ("Bi-UCS", start, goal) in costs and ("Bi-A* ALT", start, goal) in costs
+        and not math.isclose(costs[("Bi-UCS", start, goal)], costs[("Bi-A* ALT", start, goal)], rel_tol=1e-9)
+    ]
+    print(f"\nBi-A* ALT vs Bi-UCS: {'mismo costo en todos los pares' if not mismatches else f'{len(mismatches)} pares con costo distinto'}")
 
 if __name__ == "__main__":
     run_benchmark()
\ No newline at end of file
@@ -0,0 +1,345 @@
+import heapq
+import time
+import numpy as np
+from Interface.csr_graph import CSRGraph
+
+# ==========================================
+# CONTRACTION HIERARCHIES
+# ==========================================
+# Preprocesamiento: se "contraen" los nodos uno por uno, del menos al más importante.
+# Al quitar un nodo v, cada camino u -> v -> x que sea el más corto se reemplaza por
+# un atajo (shortcut) u -> x. La consulta es un Dijkstra bidireccional que solo sube
+# de rango, por eso asienta muy pocos nodos.
+
+
+class ContractionHierarchy:
+    """
+    Jerarquía de contracción lista para consultas.
+
+    - rank[i]: orden de contracción del nodo i (más alto = más importante)
+    - fwd[i]: aristas i -> j con rank[j] > rank[i] (búsqueda hacia adelante)
+    - bwd[i]: aristas j -> i con rank[j] > rank[i] (búsqueda hacia atrás)
+    - middle[(a, b)]: nodo intermedio del atajo a -> b, para desempacar la ruta
+    """
+
+    def __init__(self, node_ids, rank, fwd, bwd, middle):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.index = {nid: i for i, nid in enumerate(self.node_ids.tolist())}
+        self.rank = rank
+        self.fwd = fwd
+        self.bwd = bwd
+        self.middle = middle
+
+    # ------------------------------------------
+    # Preprocesamiento
+    # ------------------------------------------
+
+    @classmethod
+    def build(cls, G, max_settled=1000, estimate_settled=30, estimate_hops=3, verbose=False):
+        """
+        Construye la jerarquía a partir del grafo proyectado de OSMnx o de un CSRGraph.
+
+        Orden de contracción con actualización perezosa: al contraer un nodo se recalcula
+        la prioridad de sus vecinos y, al sacar un nodo del heap, se calcula de nuevo y
+        solo se contrae si sigue siendo el mínimo.
+
+        Las búsquedas de testigos se acotan por distancia (el costo del atajo más caro)
+        y terminan en cuanto asientan todos los destinos. Para contraer se permiten hasta
+        `max_settled` nodos asentados; para estimar prioridades de vecinos, solo
+        `estimate_settled` nodos y `estimate_hops` aristas. Límites más bajos crean algunos
+        atajos de más, la jerarquía sigue siendo correcta.
+        """
+        t_start = time.perf_counter()
+        graph = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+        n = graph.number_of_nodes()
+
+        offsets = graph.offsets.tolist()
+        targets = graph.targets.tolist()
+        lengths = graph.lengths.tolist()
+
+        # Adyacencias mutables del grafo que queda: se agregan atajos y se quitan los
+        # nodos contraídos, así las búsquedas de testigos solo recorren lo que sigue vivo
+        out = [dict() for _ in range(n)]
+        inn = [dict() for _ in range(n)]
+        for u in range(n):
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if v != u:
+                    out[u][v] = lengths[k]
+                    inn[v][u] = lengths[k]
+
+        # Profundidad de cada nodo: uno más que el más profundo de sus vecinos ya contraídos
+        level = [0] * n
+        middle = {}
+        # Aristas originales que representa cada atajo (las aristas originales valen 1)
+        edge_hops = {}
+        inf = float('inf')
+
+        def witness_search(source, avoid, max_cost, goals, settle_limit, hop_limit):
+            """
+            Dijkstra local desde `source` sin pasar por `avoid`. Se detiene al pasar de
+            `max_cost`, al asentar todos los `goals` o al llegar a los límites.
+            """
+            dist = {source: 0.0}
+            hops = {source: 0}
+            pq = [(0.0, source)]
+            remaining = len(goals)
+            settled = 0
+            while pq:
+                d, x = heapq.heappop(pq)
+                if d > dist[x]:
+                    continue
+                if d > max_cost:
+                    break
+                if x in goals:
+                    remaining -= 1
+                    if remaining == 0:
+                        break
+                settled += 1
+                if settled > settle_limit:
+                    break
+                h = hops[x] + 1
+                if h > hop_limit:
+                    continue
+                for y, w in out[x].items():
+                    if y == avoid:
+                        continue
+                    nd = d + w
+                    if nd < dist.get(y, inf):
+                        dist[y] = nd
+                        hops[y] = h
+                        heapq.heappush(pq, (nd, y))
+            return dist
+
+        def shortcuts_for(v, settle_limit, hop_limit):
+            """Atajos (u, x, costo) necesarios si se contrae v."""
+            shortcuts = []
+            for u, w1 in inn[v].items():
+                candidates = [(x, w1 + w2) for x, w2 in out[v].items() if x != u]
+                if not candidates:
+                    continue
+                dist = witness_search(u, v, max(c for _, c in candidates), {x for x, _ in candidates},
+                                      settle_limit, hop_limit)
+                for x, c in candidates:
+                    if dist.get(x, inf) > c:
+                        shortcuts.append((u, x, c))
+            return shortcuts
+
+        def priority(v, shortcuts):
+            # Diferencia de aristas como cociente (atajos / aristas quitadas, y lo mismo contando
+            # aristas originales) + profundidad de los vecinos contraídos. El cociente mantiene
+            # ralo el núcleo de nodos importantes; la profundidad reparte la contracción por el
+            # mapa mejor que el simple conteo de vecinos contraídos
+            removed = len(inn[v]) + len(out[v])
+            removed_hops = (sum(edge_hops.get((u, v), 1) for u in inn[v])
+                            + sum(edge_hops.get((v, x), 1) for x in out[v]))
+            added_hops = sum(edge_hops.get((u, v), 1) + edge_hops.get((v, x), 1) for u, x, _ in shortcuts)
+            return 2 * len(shortcuts) / max(removed, 1) + 2 * added_hops / max(removed_hops, 1) + level[v]
+
+        def estimate(v):
+            return priority(v, shortcuts_for(v, estimate_settled, estimate_hops))
+
+        current = [estimate(v) for v in range(n)]
+        pq = [(p, v) for v, p in enumerate(current)]
+        heapq.heapify(pq)
+
+        rank = [0] * n
+        fwd = [None] * n
+        bwd = [None] * n
+        order = 0
+        n_shortcuts = 0
+        while pq:
+            p, v = heapq.heappop(pq)
+            if p != current[v] or fwd[v] is not None:
+                continue
+
+            # Actualización perezosa: la prioridad puede haber cambiado por atajos agregados
+            # cerca de v desde la última estimación; si ya no es el mínimo, se reinserta
+            p = estimate(v)
+            if pq and p > pq[0][0]:
+                current[v] = p
+                heapq.heappush(pq, (p, v))
+                continue
+
+            for u, x, c in shortcuts_for(v, max_settled, inf):
+                if c < out[u].get(x, inf):
+                    if x not in out[u]:
+                        n_shortcuts += 1
+                    out[u][x] = c
+                    inn[x][u] = c
+                    middle[(u, x)] = v
+                    edge_hops[(u, x)] = edge_hops.get((u, v), 1) + edge_hops.get((v, x), 1)
+
+            # Lo que queda en las adyacencias de v lleva a nodos de mayor rango
+            rank[v] = order
+            order += 1
+            fwd[v] = list(out[v].items())
+            bwd[v] = list(inn[v].items())
+            neighbors = set(inn[v]) | set(out[v])
+            for u in inn[v]:
+                del out[u][v]
+            for x in out[v]:
+                del inn[x][v]
+            out[v] = inn[v] = None
+
+            for x in neighbors:
+                level[x] = max(level[x], level[v] + 1)
+                current[x] = estimate(x)
+                heapq.heappush(pq, (current[x], x))
+
+            if verbose and order % 10000 == 0:
+                print(f"  ...{order}/{n} nodos contraídos, {n_shortcuts} atajos")
+
+        if verbose:
+            print(f"CH lista: {n} nodos, {n_shortcuts} atajos en {time.perf_counter() - t_start:.1f} s")
+
+        return cls(graph.node_ids, rank, fwd, bwd, middle)
+
+    # ------------------------------------------
+    # Consulta
+    # ------------------------------------------
+
+    def query(self, source, target, stats=None, budget=None):
+        """
+        Dijkstra bidireccional sobre los grafos de subida.
+        Regresa (distancia, ruta en ids de OSM) o (inf, None) si no hay ruta o se
+        agotó el `budget` (SearchBudget) opcional.
+        Si se pasa un dict en `stats` se guarda ahí cuántos nodos alcanzaron ambas búsquedas.
+        """
+        s = self.index[source]
+        t = self.index[target]
+        if s == t:
+            return 0.0, [source]
+
+        inf = float('inf')
+        heappush, heappop = heapq.heappush, heapq.heappop
+        dist = ({s: 0.0}, {t: 0.0})
+        parents = ({s: None}, {t: None})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        adjacency = (self.fwd, self.bwd)
+        best = inf
+        meeting = None
+        iterations = 0
+        # Sin presupuesto next_check es -1 y nunca se alcanza
+        next_check = budget.first_check() if budget is not None else -1
+
+        while True:
+            if iterations == next_check:
+                next_check = budget.next_check(iterations)
+                if next_check is None:
+                    return inf, None
+            iterations += 1
+
+            # Avanzar la dirección con la llave más pequeña; se termina cuando ninguna
+            # de las dos puede mejorar la mejor ruta
+            key_f = heaps[0][0][0] if heaps[0] else inf
+            key_b = heaps[1][0][0] if heaps[1] else inf
+            side = 0 if key_f <= key_b else 1
+            if (key_f if side == 0 else key_b) >= best:
+                break
+
+            reached = dist[side]
+            d, u = heappop(heaps[side])
+            if d > reached[u]:
+                continue
+
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best = d + other
+                meeting = u
+
+            # Stall-on-demand: si un nodo de mayor rango ya alcanzado llega a u más barato,
+            # d no es la distancia real de u y expandirlo solo agranda la búsqueda
+            for x, w in adjacency[1 - side][u]:
+                if reached.get(x, inf) + w < d:
+                    break
+            else:
+                parent = parents[side]
+                heap = heaps[side]
+                for v, w in adjacency[side][u]:
+                    nd = d + w
+                    if nd < reached.get(v, inf):
+                        reached[v] = nd
+                        parent[v] = u
+                        heappush(heap, (nd, v))
+
+        if stats is not None: stats['expanded'] = len(dist[0]) + len(dist[1])
+        if meeting is None:
+            return inf, None
+
+        # Cadena s -> meeting (padres hacia adelante) y meeting -> t (padres hacia atrás)
+        up = []
+        node = meeting
+        while node is not None:
+            up.append(node)
+            node = parents[0][node]
+        up.reverse()
+        node = parents[1][meeting]
+        while node is not None:
+            up.append(node)
+            node = parents[1][node]
+
+        path = self._unpack(up)
+        return best, self.node_ids[path].tolist()
+
+    def _unpack(self, chain):
+        """Expande recursivamente los atajos de la cadena de índices."""
+        path = [chain[0]]
+        for a, b in zip(chain[:-1], chain[1:]):
+            stack = [(a, b)]
+            while stack:
+                x, y = stack.pop()
+                m = self.middle.get((x, y))
+                if m is None:
+                    path.append(y)
+                else:
+                    stack.append((m, y))
+                    stack.append((x, m))
+        return path
+
+    def shortest_path(self, source, target, stats=None, budget=None):
+        """Misma interfaz que las demás búsquedas: regresa la ruta o None."""
+        _, path = self.query(source, target, stats, budget)
+        return path
+
+    # ------------------------------------------
+    # Serialización
+    # ------------------------------------------
+
+    def save(self, path):
+        """Guarda la jerarquía en un .npz para cargarla al arrancar sin preprocesar."""
+        def to_csr(adjacency):
+            offsets = np.zeros(len(adjacency) + 1, dtype=np.int64)
+            np.cumsum([len(a) for a in adjacency], out=offsets[1:])
+            targets = np.fromiter((v for a in adjacency for v, _ in a), dtype=np.int32, count=offsets[-1])
+            weights = np.fromiter((w for a in adjacency for _, w in a), dtype=np.float64, count=offsets[-1])
+            return offsets, targets, weights
+
+        fwd_offsets, fwd_targets, fwd_weights = to_csr(self.fwd)
+        bwd_offsets, bwd_targets, bwd_weights = to_csr(self.bwd)
+        keys = list(self.middle.items())
+        np.savez(
+            path,
+            node_ids=self.node_ids,
+            rank=np.asarray(self.rank, dtype=np.int32),
+            fwd_offsets=fwd_offsets, fwd_targets=fwd_targets, fwd_weights=fwd_weights,
+            bwd_offsets=bwd_offsets, bwd_targets=bwd_targets, bwd_weights=bwd_weights,
+            sc_from=np.array([a for (a, _), _ in keys], dtype=np.int32),
+            sc_to=np.array([b for (_, b), _ in keys], dtype=np.int32),
+            sc_mid=np.array([m for _, m in keys], dtype=np.int32),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+
+        def from_csr(offsets, targets, weights):
+            offsets = offsets.tolist()
+            pairs = list(zip(targets.tolist(), weights.tolist()))
+            return [pairs[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+        fwd = from_csr(data['fwd_offsets'], data['fwd_targets'], data['fwd_weights'])
+        bwd = from_csr(data['bwd_offsets'], data['bwd_targets'], data['bwd_weights'])
+        middle = dict(zip(zip(data['sc_from'].tolist(), data['sc_to'].tolist()), data['sc_mid'].tolist()))
+        return cls(data['node_ids'], data['rank'].tolist(), fwd, bwd, middle)
+
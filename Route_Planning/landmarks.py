@@ -0,0 +1,114 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from Interface.csr_graph import CSRGraph
+
+# ==========================================
+# ALT: A*, LANDMARKS Y DESIGUALDAD DEL TRIÁNGULO
+# ==========================================
+# Para cada landmark L se guardan d(L, v) y d(v, L) para todos los nodos.
+# Por la desigualdad del triángulo, para cualquier nodo v y meta t:
+#   d(v, t) >= d(L, t) - d(L, v)   y   d(v, t) >= d(v, L) - d(t, L)
+# El máximo sobre todos los landmarks es una cota inferior mucho más ajustada
+# que la distancia Euclidiana en una red con periféricos, barrancas y sentidos únicos.
+
+
+class Landmarks:
+    """
+    Distancias precalculadas desde y hacia un conjunto de landmarks.
+    `heuristic(G, node, goal)` tiene la misma firma que `heuristic` en Uninformed_Agorithm.
+    """
+
+    def __init__(self, graph, landmark_idx, from_lm, to_lm):
+        self.graph = graph
+        self.landmark_idx = landmark_idx
+        # Arreglos (n_nodos, k): fila por nodo para leer todos sus landmarks de una vez
+        self.from_lm = from_lm
+        self.to_lm = to_lm
+        # Cota de todos los nodos hacia la última meta consultada, como lista de Python
+        self._goal = None
+        self._h_goal = None
+
+    @classmethod
+    def build(cls, G, k=8, seed=0):
+        """
+        Elige `k` landmarks con selección "farthest": cada nuevo landmark es el nodo
+        más lejano por red de los ya elegidos, así quedan en la orilla del mapa.
+        """
+        graph = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+        matrix = graph.to_scipy()
+        reversed_matrix = graph.to_scipy_reversed()
+        n = graph.number_of_nodes()
+        k = min(k, n)
+
+        rng = np.random.default_rng(seed)
+        # El primer landmark es el nodo más lejano de un nodo aleatorio
+        dist = dijkstra(matrix, directed=True, indices=int(rng.integers(n)))
+        dist[~np.isfinite(dist)] = -1
+        chosen = [int(np.argmax(dist))]
+        while len(chosen) < k:
+            dist = dijkstra(matrix, directed=True, indices=chosen, min_only=True)
+            dist[~np.isfinite(dist)] = -1
+            far = int(np.argmax(dist))
+            if dist[far] <= 0:
+                break
+            chosen.append(far)
+
+        landmark_idx = np.array(chosen, dtype=np.int64)
+        from_lm = dijkstra(matrix, directed=True, indices=landmark_idx).T
+        to_lm = dijkstra(reversed_matrix, directed=True, indices=landmark_idx).T
+        return cls(graph, landmark_idx, np.ascontiguousarray(from_lm), np.ascontiguousarray(to_lm))
+
+    def lower_bound(self, node, goal):
+        """Cota inferior de d(node, goal) en metros."""
+        index = self.graph.index
+        v = index[node]
+        t = index[goal]
+        with np.errstate(invalid='ignore'):
+            # inf - inf (landmark sin conexión con ninguno de los dos) no aporta cota
+            bounds = np.fmax(self.from_lm[t] - self.from_lm[v], self.to_lm[v] - self.to_lm[t])
+        h = np.max(np.nan_to_num(bounds, nan=0.0, posinf=np.inf, neginf=0.0))
+        return float(h) if h > 0 else 0.0
+
+    def bounds_to(self, goal):
+        """Cota inferior de d(v, goal) para todos los nodos v a la vez (arreglo de n)."""
+        t = self.graph.index[goal]
+        with np.errstate(invalid='ignore'):
+            bounds = np.fmax(self.from_lm[t][None, :] - self.from_lm, self.to_lm - self.to_lm[t][None, :])
+        return _max_bound(bounds)
+
+    def bounds_from(self, start):
+        """Cota inferior de d(start, v) para todos los nodos v a la vez (arreglo de n)."""
+        s = self.graph.index[start]
+        with np.errstate(invalid='ignore'):
+            bounds = np.fmax(self.from_lm - self.from_lm[s][None, :], self.to_lm[s][None, :] - self.to_lm)
+        return _max_bound(bounds)
+
+    def pair_potential(self, start, goal):
+        """
+        Potencial promedio p(v) = (h(v, goal) - h(start, v)) / 2 de A* bidireccional
+        para una consulta. `start` y `goal` no cambian durante la búsqueda, así que las
+        dos cotas se calculan una vez con NumPy y p(v) es una consulta a una lista.
+        """
+        p = ((self.bounds_to(goal) - self.bounds_from(start)) / 2).tolist()
+        index = self.graph.index
+
+        def potential(node):
+            return p[index[node]]
+        return potential
+
+    def heuristic(self, G, node, goal):
+        """
+        Heurística ALT con la firma de `heuristic(G, node, goal)` para usarla en A*.
+        La primera llamada con una meta nueva calcula las cotas de todos los nodos
+        con NumPy, las siguientes son una consulta a una lista.
+        """
+        if goal != self._goal:
+            self._h_goal = self.bounds_to(goal).tolist()
+            self._goal = goal
+        return self._h_goal[self.graph.index[node]]
+
+
+def _max_bound(bounds):
+    """Máximo por fila de las cotas (n, k), sin NaN (inf - inf) ni cotas negativas."""
+    bounds = np.nan_to_num(bounds, nan=0.0, posinf=np.inf, neginf=0.0)
+    return np.maximum(bounds.max(axis=1), 0.0) if bounds.shape[1] else np.zeros(len(bounds))
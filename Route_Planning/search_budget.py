@@ -0,0 +1,82 @@
+import time
+
+# Iteraciones entre revisiones del reloj y de la cancelación; revisar en cada
+# iteración costaba una llamada a time.time() por nodo sacado de la frontera
+CHECK_EVERY = 1024
+
+
+class CancelToken:
+    """Bandera de cancelación externa: otro hilo llama `cancel()` y la búsqueda se detiene."""
+
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+
+class SearchBudget:
+    """
+    Presupuesto de una búsqueda, compartido por todos los algoritmos y el servidor.
+
+    - max_expansions: máximo de iteraciones del ciclo principal (nodos sacados de la frontera)
+    - timeout: segundos desde que se crea el presupuesto; el reloj solo se consulta
+      cada `check_every` iteraciones
+    - cancel: objeto con `is_cancelled()` (CancelToken o equivalente) que se revisa
+      con la misma frecuencia que el reloj
+
+    El ciclo de búsqueda lleva su propio contador de iteraciones terminadas y solo
+    llama a `next_check` cuando llega al número que le indicó la llamada anterior:
+
+        next_check = budget.first_check()
+        while frontera:
+            if iterations == next_check:
+                next_check = budget.next_check(iterations)
+                if next_check is None: break
+            iterations += 1
+
+    `reason` queda en 'expansiones', 'tiempo' o 'cancelada' cuando el presupuesto se agota.
+    """
+
+    def __init__(self, max_expansions=None, timeout=None, cancel=None, check_every=CHECK_EVERY):
+        self.max_expansions = max_expansions
+        # time.monotonic es el mismo reloj en todos los procesos, el presupuesto se puede mandar a un worker
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.cancel = cancel
+        self.check_every = check_every
+        self.reason = None
+
+    @classmethod
+    def resolve(cls, budget, timeout):
+        """El presupuesto dado, o uno solo de tiempo para las llamadas que aún pasan `timeout`."""
+        return budget if budget is not None else cls(timeout=timeout)
+
+    def check(self, iterations=0):
+        """Motivo por el que ya no se puede seguir ('cancelada', 'expansiones', 'tiempo') o None."""
+        if self.cancel is not None and self.cancel.is_cancelled():
+            self.reason = 'cancelada'
+        elif self.max_expansions is not None and iterations >= self.max_expansions:
+            self.reason = 'expansiones'
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            self.reason = 'tiempo'
+        return self.reason
+
+    def first_check(self):
+        """Primer `next_check`; si ya está agotado regresa 0 para que el ciclo se detenga de inmediato."""
+        n = self.next_check(0)
+        return 0 if n is None else n
+
+    def next_check(self, iterations):
+        """
+        Número de iteración en que hay que volver a llamar, o None si el presupuesto
+        se agotó. Nunca se pasa de `max_expansions`.
+        """
+        if self.check(iterations) is not None:
+            return None
+        step = self.check_every
+        if self.max_expansions is not None:
+            step = min(step, self.max_expansions - iterations)
+        return iterations + step
@@ -0,0 +1,88 @@
+import time
+from Interface.csr_graph import CSRGraph
+
+
+class SearchStats(dict):
+    """
+    Contadores de una búsqueda: nodos sacados de la frontera ('popped'), metidos
+    ('pushed'), aristas revisadas ('relaxed'), nodos expandidos ('expanded'),
+    tamaño máximo de la frontera ('peak_frontier') y segundos ('elapsed').
+
+    Es un dict, así que se puede pasar en el mismo parámetro `stats` donde antes
+    iba un dict simple (que solo recibe 'expanded') y se serializa tal cual a JSON.
+
+    - trace: si es True guarda en `self.trace` los nodos en el orden en que se
+      expandieron, para animar la frontera de búsqueda
+    - on_expand: función opcional llamada con cada nodo expandido
+    """
+
+    def __init__(self, trace=False, on_expand=None):
+        super().__init__(popped=0, pushed=0, relaxed=0, expanded=0, peak_frontier=0, elapsed=0.0)
+        self.trace = [] if trace else None
+        self.on_expand = on_expand
+        self.started = None
+
+    def trace_coords(self, G):
+        """Coordenadas proyectadas (xs, ys) de los nodos de `trace`, en orden."""
+        if isinstance(G, CSRGraph):
+            return G.coords_of(self.trace)
+        xs = [G.nodes[n]['x'] for n in self.trace]
+        ys = [G.nodes[n]['y'] for n in self.trace]
+        return xs, ys
+
+
+def instrument(stats, push, pop, expand, frontier=1):
+    """
+    Regresa las funciones (push, pop, expand) que usa el ciclo de búsqueda.
+
+    Sin un SearchStats (None o un dict simple) regresa las mismas funciones, así el
+    ciclo no paga nada por la instrumentación. Con un SearchStats regresa envolturas
+    que cuentan cada operación. `frontier` es cuántos elementos trae ya la frontera.
+    `expand` puede ser una tupla de funciones (búsquedas bidireccionales).
+    """
+    if not isinstance(stats, SearchStats):
+        return push, pop, expand
+
+    stats.started = time.perf_counter()
+    stats['peak_frontier'] = max(stats['peak_frontier'], frontier)
+    trace = stats.trace
+    on_expand = stats.on_expand
+
+    def counted_push(*args):
+        push(*args)
+        stats['pushed'] += 1
+        size = frontier + stats['pushed'] - stats['popped']
+        if size > stats['peak_frontier']:
+            stats['peak_frontier'] = size
+
+    def counted_pop(*args):
+        item = pop(*args)
+        stats['popped'] += 1
+        return item
+
+    def counter(expand_fn):
+        def counted_expand(node):
+            neighbors = expand_fn(node)
+            # G.neighbors de networkx es un iterador, hay que materializarlo para contarlo
+            if not isinstance(neighbors, list):
+                neighbors = list(neighbors)
+            stats['relaxed'] += len(neighbors)
+            if trace is not None:
+                trace.append(node)
+            if on_expand is not None:
+                on_expand(node)
+            return neighbors
+        return counted_expand
+
+    if isinstance(expand, tuple):
+        return counted_push, counted_pop, tuple(counter(fn) for fn in expand)
+    return counted_push, counted_pop, counter(expand)
+
+
+def record(stats, expanded):
+    """Guarda los nodos expandidos al terminar la búsqueda (y el tiempo si es un SearchStats)."""
+    if stats is None:
+        return
+    stats['expanded'] = expanded
+    if isinstance(stats, SearchStats) and stats.started is not None:
+        stats['elapsed'] = time.perf_counter() - stats.started